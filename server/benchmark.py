@@ -0,0 +1,174 @@
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from argparse import ArgumentParser
+from typing import List, Dict, Optional
+
+import pandas
+
+from service.archive_scraping_service import ArchiveScrapingService
+from service.http_archive_service import HttpArchiveService
+from service.maker_registry import get_maker_plugins, MAKER_NAME_LIST, MakerPlugin
+from service.sqlite_database_service import SqliteDataBaseService
+
+# 基準より何割遅く(大きく)なったら劣化とみなすか
+DEFAULT_THRESHOLD = 0.1
+
+# 比較する指標(値が大きいほど悪いもの)
+COMPARE_KEY_LIST = ['seconds', 'peak_memory']
+
+# 劣化が見つかった場合の終了ステータス
+EXIT_REGRESSION = 1
+
+# アーカイブが見つからなかった場合の終了ステータス
+EXIT_ARCHIVE_NOT_FOUND = 2
+
+
+def run_plugin(plugin: MakerPlugin, scraping: ArchiveScrapingService) -> int:
+    """メーカーごとの処理を全段階について実行し、整形後のレコード数を返す"""
+    lens_list = plugin.discover(scraping)
+    raw_data = plugin.fetch(scraping, lens_list)
+    return len(plugin.normalize(raw_data))
+
+
+def measure_plugin(plugin: MakerPlugin, scraping: ArchiveScrapingService, repeat: int) -> Dict[str, any]:
+    """メーカーごとの処理の所要時間・ピークメモリ・処理速度を計測する
+
+    所要時間はrepeat回のうち最短のものを使う。
+    tracemalloc自体が処理を遅くするので、ピークメモリは所要時間とは別に1回だけ計測する。
+
+    Parameters
+    ----------
+    plugin メーカーごとの処理
+    scraping アーカイブから読み込むスクレイピング用のサービス
+    repeat 所要時間を計測する回数
+
+    Returns
+    -------
+        計測結果
+    """
+    seconds_list: List[float] = []
+    records = 0
+    pages = 0
+    for _ in range(0, max(repeat, 1)):
+        scraping.reset_page_count()
+        start = time.perf_counter()
+        records = run_plugin(plugin, scraping)
+        seconds_list.append(time.perf_counter() - start)
+        pages = scraping.page_count
+
+    tracemalloc.start()
+    try:
+        run_plugin(plugin, scraping)
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    seconds = min(seconds_list)
+    return {
+        'seconds': seconds,
+        'peak_memory': peak_memory,
+        'pages': pages,
+        'pages_per_sec': pages / seconds if seconds > 0 else 0.0,
+        'records': records,
+    }
+
+
+def compare_result(result: Dict[str, any], baseline: Dict[str, any], threshold: float) -> List[str]:
+    """基準の計測結果と比べて、劣化している項目の説明の一覧を返す
+
+    Parameters
+    ----------
+    result 今回の計測結果
+    baseline 基準の計測結果
+    threshold 基準より何割悪くなったら劣化とみなすか
+
+    Returns
+    -------
+        劣化している項目の説明の一覧
+    """
+    output: List[str] = []
+    for maker, data in result['makers'].items():
+        if maker not in baseline['makers']:
+            continue
+        base_data = baseline['makers'][maker]
+        for key in COMPARE_KEY_LIST:
+            if base_data[key] <= 0:
+                continue
+            ratio = data[key] / base_data[key]
+            if ratio > 1 + threshold:
+                output.append(f'{maker} {key}: {base_data[key]:.4g} -> {data[key]:.4g} ({ratio - 1:+.1%})')
+    return output
+
+
+def print_result(result: Dict[str, any], baseline: Optional[Dict[str, any]]) -> None:
+    """計測結果を表示する(基準があれば、基準との比も表示する)"""
+    print(f"{'maker':<10} {'seconds':>9} {'peak MiB':>9} {'pages':>6} {'pages/s':>9} {'records':>8}")
+    for maker, data in result['makers'].items():
+        line = f"{maker:<10} {data['seconds']:9.3f} {data['peak_memory'] / 1024 / 1024:9.2f} {data['pages']:6d}" \
+               f" {data['pages_per_sec']:9.1f} {data['records']:8d}"
+        if baseline is not None and maker in baseline['makers']:
+            base_data = baseline['makers'][maker]
+            if base_data['seconds'] > 0:
+                line += f"  time {data['seconds'] / base_data['seconds'] - 1:+.1%}"
+            if base_data['peak_memory'] > 0:
+                line += f"  memory {data['peak_memory'] / base_data['peak_memory'] - 1:+.1%}"
+        print(line)
+
+
+def main(archive_path: str, maker: List[str], repeat: int, output_path: Optional[str], baseline_path: Optional[str],
+         threshold: float) -> int:
+    # 存在しないパスを開くと空のアーカイブが作成されてしまうので、先に確かめる
+    if not os.path.isfile(archive_path):
+        print(f'アーカイブが見つかりません: {archive_path}', file=sys.stderr)
+        return EXIT_ARCHIVE_NOT_FOUND
+    archive_database = SqliteDataBaseService(archive_path)
+    try:
+        scraping = ArchiveScrapingService(HttpArchiveService(archive_database))
+    finally:
+        archive_database.close()
+
+    result: Dict[str, any] = {
+        'created_at': time.time(),
+        'python': platform.python_version(),
+        'pandas': pandas.__version__,
+        'repeat': repeat,
+        'makers': {},
+    }
+    for plugin in get_maker_plugins(maker):
+        result['makers'][plugin.name] = measure_plugin(plugin, scraping, repeat)
+
+    baseline: Optional[Dict[str, any]] = None
+    if baseline_path is not None:
+        with open(baseline_path, encoding='UTF-8') as f:
+            baseline = json.load(f)
+    print_result(result, baseline)
+
+    if output_path is not None:
+        with open(output_path, 'w', encoding='UTF-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+    if baseline is not None:
+        regression_list = compare_result(result, baseline, threshold)
+        if len(regression_list) > 0:
+            print('【劣化】')
+            for regression in regression_list:
+                print(regression)
+            return EXIT_REGRESSION
+    return 0
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='アーカイブに記録したWebページを使い、メーカーごとの処理を計測する')
+    parser.add_argument('archive', help='main.py --recordで記録したアーカイブ')
+    parser.add_argument('--maker', nargs='+', default=MAKER_NAME_LIST, help='計測するメーカー')
+    parser.add_argument('--repeat', type=int, default=3, help='所要時間を計測する回数(最短のものを使う)')
+    parser.add_argument('--output', metavar='PATH', help='計測結果を書き込むJSONファイル')
+    parser.add_argument('--compare', metavar='PATH', help='基準とする計測結果のJSONファイル')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='基準より何割悪くなったら劣化とみなすか')
+    args = parser.parse_args()
+    sys.exit(main(args.archive, args.maker, args.repeat, args.output, args.compare, args.threshold))
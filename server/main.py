@@ -1,132 +1,186 @@
-from typing import List
+import json
+import os
+import sys
+from argparse import ArgumentParser
+from tempfile import TemporaryDirectory
+from typing import List, Optional
 
 import pandas
-from pandas import DataFrame
-
-from constant import Lens
-from service.i_database_service import IDataBaseService
-from service.i_scraping_service import IScrapingService
-from service.lxml_scraping_service import LxmlScrapingService
-from service.maker.cosina import get_cosina_lens_list
-from service.maker.laowa import get_laowa_lens_list
-from service.maker.leica import get_leica_lens_list
-from service.maker.olympus import get_olympus_lens_list
-from service.maker.panasonic import get_panasonic_lens_list, get_panasonic_old_lens_list
-from service.maker.samyang import get_samyang_lens_list
-from service.maker.sigma import get_sigma_lens_list
+
+from service.artifact_service import publish_artifacts, publish_patch, read_bytes, get_file_hash, HashingWriter, \
+    get_artifact_file_list, MANIFEST_PATH, PATCH_INDEX_PATH
+from service.fetch_metrics import FETCH_METRICS_JSON_PATH, FETCH_METRICS_TEXT_PATH
+from service.http_archive_service import HttpArchiveService
+from service.lens_data_service import merge_lens_data, write_lens_json, write_lens_columnar, \
+    write_lens_shards, SHARD_MANIFEST_PATH
+from service.lxml_scraping_service import LxmlScrapingService, MODE_LIVE, MODE_RECORD, MODE_REPLAY
+from service.maker_registry import get_maker_plugins, MAKER_NAME_LIST
+from service.maker_snapshot_service import MakerSnapshotService
+from service.memory_profiler import memory_profiler, is_memory_profile_env_enabled, MEMORY_PROFILE_ENV, \
+    MEMORY_PROFILE_PATH
+from service.pipeline_runner import PipelineRunner
+from profiler import profiler, is_profile_env_enabled, PROFILE_ENV, PROFILE_REPORT_PATH, \
+    PROFILE_STACK_PATH
 from service.sqlite_database_service import SqliteDataBaseService
 
 pandas.options.display.max_columns = None
 pandas.options.display.width = 150
 
-
-def main(maker: List[str]):
-    database: IDataBaseService = SqliteDataBaseService('database.db')
-    scraping: IScrapingService = LxmlScrapingService(database)
-
-    df = DataFrame()
-
-    if 'Panasonic' in maker:
-        # Panasonic
-        print('【Panasonic】')
-        df1 = get_panasonic_lens_list(scraping)
-        if len(df) == 0:
-            df = df1
-        df2 = get_panasonic_old_lens_list(scraping)
-        df = pandas.concat([df, df2])
-
-    if 'OLYMPUS' in maker:
-        # OLYMPUS
-        print('【OLYMPUS】')
-        df3 = get_olympus_lens_list(scraping)
-        if len(df) == 0:
-            df = df3
-        else:
-            df = pandas.concat([df, df3])
-
-    if 'SIGMA' in maker:
-        # SIGMA
-        print('【SIGMA】')
-        df4 = get_sigma_lens_list(scraping)
-        if len(df) == 0:
-            df = df4
-        else:
-            df = pandas.concat([df, df4])
-
-    if 'LEICA' in maker:
-        # LEICA
-        print('【LEICA】')
-        df5 = get_leica_lens_list(scraping)
-        if len(df) == 0:
-            df = df5
-        else:
-            df = pandas.concat([df, df5])
-
-    if 'COSINA' in maker:
-        # COSINA
-        print('【COSINA】')
-        df6 = get_cosina_lens_list(scraping)
-        if len(df) == 0:
-            df = df6
-        else:
-            df = pandas.concat([df, df6])
-
-    if 'LAOWA' in maker:
-        # LAOWA
-        print('【LAOWA】')
-        df7 = get_laowa_lens_list(scraping)
-        if len(df) == 0:
-            df = df7
-        else:
-            df = pandas.concat([df, df7])
-
-    if 'SAMYANG' in maker:
-        # SAMYANG
-        print('【SAMYANG】')
-        df8 = get_samyang_lens_list(scraping)
-        if len(df) == 0:
-            df = df8
-        else:
-            df = pandas.concat([df, df8])
-
-    # その他(DZOFilm・KAMLAN・KOWA・TAMRON・Tokina・銘匠光学・Vazen・安原製作所・ヨンヌオ・中一光学・七工匠)
-    # 銘匠光学はTTArtisan、ヨンヌオはYONGNUO、中一光学はZhongyi Optics Electronics、七工匠は7artisansとする
-    if 'Other' in maker:
-        print('【Other】')
-        df9 = pandas.read_csv('csv/lenses.csv', dtype={'product_number': str})
-        if len(df) == 0:
-            df = df9
-        else:
-            df = pandas.concat([df, df9])
-
-    column_list = ['maker', 'name', 'product_number', 'wide_focal_length', 'telephoto_focal_length', 'wide_f_number',
-                   'telephoto_f_number', 'wide_min_focus_distance', 'telephoto_min_focus_distance',
-                   'max_photographing_magnification', 'filter_diameter', 'is_drip_proof', 'has_image_stabilization',
-                   'is_inner_zoom', 'overall_diameter', 'overall_length', 'weight', 'price', 'mount', 'url']
-    for column in df.columns:
-        if column not in column_list:
-            column_list.append(column)
-    temp = []
-    for record in df.to_dict(orient='records'):
-        temp2 = {}
-        for key in column_list:
-            if key in record:
-                temp2[key] = record[key]
-            else:
-                temp2[key] = ''
-        temp.append(temp2)
-    df = DataFrame.from_records(temp)
-    if '絞り範囲' in df:
-        del df['絞り範囲']
+# 出力が前回から変化しなかった場合の終了ステータス
+EXIT_UNCHANGED = 3
+
+# 結合したレンズ情報の出力先
+LENS_DATA_PATH = 'lens_data.json'
+
+# 列指向形式のレンズ情報の出力先
+LENS_COLUMNAR_PATH = 'lens_data.columnar.json'
+
+
+def main(maker: List[str], jobs: int = 1, incremental: bool = True, compact: bool = False, force: bool = False,
+         record: Optional[str] = None, replay: Optional[str] = None, profile: bool = False,
+         memory_profile: bool = False) -> int:
+    if profile or is_profile_env_enabled():
+        profiler.enable()
+    if memory_profile or is_memory_profile_env_enabled():
+        memory_profiler.enable()
+        if jobs > 1:
+            # 並列に実行すると、メーカーごと・段階ごとのメモリ使用量を切り分けられない
+            print('メモリ使用量を計測するため、メーカーごとの処理を1つずつ実行します')
+            jobs = 1
+    try:
+        return run(maker, jobs, incremental, compact, force, record, replay)
+    finally:
+        if profiler.enabled:
+            profiler.write_report()
+            print(f'profile: {PROFILE_REPORT_PATH}, {PROFILE_STACK_PATH}')
+        if memory_profiler.enabled:
+            memory_profiler.print_summary()
+            memory_profiler.write_report()
+            memory_profiler.disable()
+            print(f'memory profile: {MEMORY_PROFILE_PATH}')
+
+
+def run(maker: List[str], jobs: int, incremental: bool, compact: bool, force: bool, record: Optional[str],
+        replay: Optional[str]) -> int:
+    mode = MODE_RECORD if record is not None else MODE_REPLAY if replay is not None else MODE_LIVE
+    with TemporaryDirectory() as temp_dir:
+        # 再生時は、手元のキャッシュや前回の整形結果を使わず、アーカイブの内容だけから作成する
+        database_path = os.path.join(temp_dir, 'database.db') if mode == MODE_REPLAY else 'database.db'
+        with SqliteDataBaseService(database_path) as database:
+            archive_database: Optional[SqliteDataBaseService] = None
+            archive: Optional[HttpArchiveService] = None
+            if mode == MODE_REPLAY and not os.path.exists(replay):
+                raise FileNotFoundError(replay)
+            if mode != MODE_LIVE:
+                archive_database = SqliteDataBaseService(record if mode == MODE_RECORD else replay)
+                archive = HttpArchiveService(archive_database)
+            scraping = LxmlScrapingService(database, mode=mode, archive=archive)
+            try:
+                # 記録時は、全てのWebページを取得し直すよう、前回の整形結果を使わない
+                # (保存もしない。入力のハッシュ値を求める際に、キャッシュを使えず同じページを再度取得してしまうため)
+                snapshot = MakerSnapshotService(database, scraping) if mode != MODE_RECORD else None
+                runner = PipelineRunner(scraping, jobs, snapshot, incremental)
+                return build(maker, runner, compact, force)
+            finally:
+                scraping.close()
+                # キャッシュの効き具合やホストごとの応答時間を、途中で失敗した場合も含めて書き出す
+                scraping.metrics.write()
+                print(f'cache hit ratio: {scraping.metrics.get_hit_ratio():.1%}'
+                      f' (metrics: {FETCH_METRICS_JSON_PATH}, {FETCH_METRICS_TEXT_PATH})')
+                if archive_database is not None:
+                    archive_database.close()
+
+
+def is_output_complete(lens_data_hash: str) -> bool:
+    """lens_data.jsonから作成するファイルが全て揃っていて、指定したハッシュ値の内容に対応しているかを返す"""
+    manifest_data = read_bytes(MANIFEST_PATH)
+    shard_manifest_data = read_bytes(SHARD_MANIFEST_PATH)
+    patch_index_data = read_bytes(PATCH_INDEX_PATH)
+    if manifest_data is None or shard_manifest_data is None or patch_index_data is None:
+        return False
+
+    # ハッシュ値付きの名前の版と圧縮済みの版
+    manifest = json.loads(manifest_data)
+    if LENS_DATA_PATH not in manifest or manifest[LENS_DATA_PATH]['sha256'] != lens_data_hash:
+        return False
+    if LENS_COLUMNAR_PATH not in manifest \
+            or manifest[LENS_COLUMNAR_PATH]['sha256'] != get_file_hash(LENS_COLUMNAR_PATH):
+        return False
+    if not all(os.path.exists(y) for x in manifest.values() for y in get_artifact_file_list(x)):
+        return False
+
+    # マウントごと・メーカーごとに分割したファイル
+    shard_manifest = json.loads(shard_manifest_data)
+    if any(get_file_hash(x['file']) != x['sha256'] for column in ['mount', 'maker'] for x in shard_manifest[column]):
+        return False
+
+    # 差分パッチの一覧
+    return json.loads(patch_index_data)['latest'] == lens_data_hash
+
+
+def build(maker: List[str], runner: PipelineRunner, compact: bool = False, force: bool = False) -> int:
+    # メーカーごとに並列で取得する(結合後はLENS_SORT_COLUMN_LISTの順に並べ替えるので、出力は取得順に依らない)
+    df_list = runner.run(get_maker_plugins(maker))
+    runner.print_stage_time()
+    with profiler.section('merge_lens_data'), memory_profiler.section('merge_lens_data'):
+        df = merge_lens_data(df_list)
 
     # df.to_csv('df.csv', index=False, encoding='utf_8_sig')
-    lens_list = [Lens.from_dict(x) for x in df.to_dict(orient='records')]
-    with open('lens_data.json', 'w', encoding='UTF-8') as f:
-        f.write(Lens.schema().dumps(lens_list, many=True, ensure_ascii=False, indent=2, sort_keys=True))
+    # 全体をメモリに溜めないよう、一時ファイルへ書き込みながらハッシュ値を求める
+    temp_path = LENS_DATA_PATH + '.tmp'
+    with open(temp_path, 'wb') as f, profiler.section('write_lens_json'), \
+            memory_profiler.section('write_lens_json'):
+        writer = HashingWriter(f)
+        write_lens_json(df, writer, compact)
+
+    try:
+        # 前回と同じ内容で、作成するファイルも全て揃っていれば、タイムスタンプや配信用のファイルを更新しないよう何も書き込まない
+        if not force and get_file_hash(LENS_DATA_PATH) == writer.hexdigest() and is_output_complete(writer.hexdigest()):
+            print('unchanged')
+            return EXIT_UNCHANGED
+
+        # 読み込みの速い列指向形式も併せて出力する
+        with open(LENS_COLUMNAR_PATH, 'w', encoding='UTF-8') as f, profiler.section('write_lens_columnar'), \
+                memory_profiler.section('write_lens_columnar'):
+            write_lens_columnar(df, f)
+
+        # 必要なマウント・メーカーの分だけ読み込めるよう、分割したファイルも出力する
+        with profiler.section('write_lens_shards'), memory_profiler.section('write_lens_shards'):
+            write_lens_shards(df)
+
+        # 長期間キャッシュできるよう、ハッシュ値付きの名前と圧縮済みの版を作成する
+        with profiler.section('publish_artifacts'):
+            publish_artifacts([LENS_DATA_PATH, LENS_COLUMNAR_PATH], source_path_dict={LENS_DATA_PATH: temp_path})
+
+        # 前回のデータからの差分パッチを作成する
+        with profiler.section('publish_patch'):
+            publish_patch(read_bytes(LENS_DATA_PATH), temp_path)
+
+        # 途中で失敗した場合に、次回も「変化無し」と判定されて派生ファイルが古いまま残らないよう、
+        # lens_data.json自体は最後に置き換える
+        os.replace(temp_path, LENS_DATA_PATH)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    return 0
 
 
 if __name__ == '__main__':
-    maker_list = [
-        'Panasonic', 'OLYMPUS', 'SIGMA', 'LEICA', 'COSINA', 'LAOWA', 'SAMYANG', 'Other',
-    ]
-    main(maker_list)
+    parser = ArgumentParser()
+    parser.add_argument('--maker', nargs='+', default=MAKER_NAME_LIST, help='取得するメーカー')
+    parser.add_argument('--jobs', type=int, default=1, help='メーカーごとの取得処理を並列に実行する数')
+    parser.add_argument('--full', action='store_true', help='前回の整形結果を再利用せず、全メーカーを処理し直す')
+    parser.add_argument('--compact', action='store_true', help='lens_data.jsonをインデント無しで出力する')
+    parser.add_argument('--force', action='store_true', help='前回から変化が無くても出力し直す')
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--record', metavar='PATH', help='全てのWebページを取得し直し、要求・応答をアーカイブに記録する')
+    group.add_argument('--replay', metavar='PATH', help='ネットワークにアクセスせず、アーカイブに記録した応答から作成する')
+    parser.add_argument('--profile', action='store_true',
+                        help=f'処理ごとの所要時間を計測し、{PROFILE_REPORT_PATH}・{PROFILE_STACK_PATH}に書き込む'
+                             f'(環境変数{PROFILE_ENV}でも有効にできる)')
+    parser.add_argument('--memory-profile', action='store_true',
+                        help=f'メーカーごと・段階ごとのメモリ使用量を計測し、{MEMORY_PROFILE_PATH}に書き込む'
+                             f'(環境変数{MEMORY_PROFILE_ENV}でも有効にできる)')
+    args = parser.parse_args()
+    sys.exit(main(args.maker, args.jobs, not args.full, args.compact, args.force, args.record, args.replay,
+                  args.profile, args.memory_profile))
@@ -40,7 +40,7 @@ class DomObject(metaclass=ABCMeta):
 
         Returns
         -------
-            テキスト分
+            テキスト分(全角英数字・記号は半角にし、連続する空白・改行は1つの空白にまとめ、前後の空白は取り除く)
         """
         pass
 
@@ -51,7 +51,7 @@ class DomObject(metaclass=ABCMeta):
 
         Returns
         -------
-            全てのテキスト分
+            全てのテキスト分(textと同様に正規化したもの)
         """
         pass
 
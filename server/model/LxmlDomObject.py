@@ -1,33 +1,53 @@
-from typing import Optional, List, MutableMapping
+from typing import Optional, List, MutableMapping, Callable
 
 # noinspection PyProtectedMember
 from lxml import html
 from lxml.html import HtmlElement
 from model.DomObject import DomObject
+from profiler import profiler
+from normalization import normalize_text
 
 
 class LxmlDomObject(DomObject):
     """DOMオブジェクト"""
 
-    def __init__(self, dom: HtmlElement):
-        self.dom = dom
+    def __init__(self, dom: Optional[HtmlElement] = None, loader: Optional[Callable[[], HtmlElement]] = None):
+        """
+        Parameters
+        ----------
+        dom DOMの実体
+        loader DOMの実体を作成する関数(domを省略した場合、初めて参照した際に呼び出す)
+        """
+        self._dom = dom
+        self._loader = loader
 
+    @property
+    def dom(self) -> HtmlElement:
+        if self._dom is None:
+            with profiler.section('parse_page'):
+                self._dom = self._loader()
+            self._loader = None
+        return self._dom
+
+    @profiler.profiled('DomObject.find')
     def find(self, query: str) -> Optional['DomObject']:
         temp = self.dom.cssselect(query)
         if len(temp) == 0:
             return None
         return LxmlDomObject(temp[0])
 
+    @profiler.profiled('DomObject.find_all')
     def find_all(self, query: str) -> List['DomObject']:
         return [LxmlDomObject(x) for x in self.dom.cssselect(query)]
 
+    # テキストは、全角英数字・記号の半角化と空白の整理を1度で済ませた状態で返す
     @property
     def text(self) -> str:
-        return self.dom.text
+        return normalize_text(self.dom.text)
 
     @property
     def full_text(self) -> str:
-        return self.dom.text_content()
+        return normalize_text(self.dom.text_content())
 
     @property
     def attrs(self) -> MutableMapping:
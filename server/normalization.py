@@ -0,0 +1,12 @@
+from typing import Dict, Optional
+
+# 全角の英数字・記号(U+FF01～U+FF5E)と全角空白を、半角にする変換表
+FULL_WIDTH_TABLE: Dict[int, int] = {x: x - 0xFEE0 for x in range(0xFF01, 0xFF5F)}
+FULL_WIDTH_TABLE[0x3000] = 0x20
+
+
+def normalize_text(text: Optional[str]) -> Optional[str]:
+    """全角の英数字・記号を半角にし、連続する空白・改行を1つの空白にまとめ、前後の空白を取り除く(NoneはNoneのまま)"""
+    if text is None:
+        return None
+    return ' '.join(text.translate(FULL_WIDTH_TABLE).split())
@@ -0,0 +1,139 @@
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Callable, TypeVar, Any
+
+T = TypeVar('T')
+
+# これが設定されていれば(空文字列・'0'以外なら)計測を有効にする環境変数
+PROFILE_ENV = 'MFT_PROFILE'
+
+# 計測結果の出力先(JSON形式と、flamegraph.pl等で読み込めるcollapsed stack形式)
+PROFILE_REPORT_PATH = 'profile.json'
+PROFILE_STACK_PATH = 'profile.folded'
+
+
+def is_profile_env_enabled() -> bool:
+    """環境変数で計測が有効にされているかを返す"""
+    return os.environ.get(PROFILE_ENV, '') not in ('', '0')
+
+
+class Profiler:
+    """処理ごとの所要時間と回数を集計する
+
+    無効な間は、計測対象の処理を呼び出す前にフラグを1つ調べるだけで済むようにしている。
+    処理の入れ子はスレッドごとに追跡し、呼び出し経路ごとの(子の処理を除いた)所要時間も集計する。
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.section_dict: Dict[str, List[float]] = {}
+        self.stack_dict: Dict[str, float] = {}
+        self.counter_dict: Dict[str, int] = {}
+
+    def enable(self) -> None:
+        """計測を有効にする(それまでの集計結果は捨てる)"""
+        with self.lock:
+            self.section_dict = {}
+            self.stack_dict = {}
+            self.counter_dict = {}
+        self.enabled = True
+
+    def disable(self) -> None:
+        """計測を無効にする"""
+        self.enabled = False
+
+    def _get_stack(self) -> List[list]:
+        stack = getattr(self.local, 'stack', None)
+        if stack is None:
+            stack = self.local.stack = []
+        return stack
+
+    @contextmanager
+    def section(self, name: str):
+        """withブロック内の処理を、指定した名前の処理として計測する
+
+        Parameters
+        ----------
+        name 処理の名前
+        """
+        if not self.enabled:
+            yield
+            return
+        stack = self._get_stack()
+        # [名前, 呼び出し経路, 開始時刻, 子の処理の所要時間]
+        path = f'{stack[-1][1]};{name}' if len(stack) > 0 else name
+        frame = [name, path, time.perf_counter(), 0.0]
+        stack.append(frame)
+        try:
+            yield
+        finally:
+            stack.pop()
+            seconds = time.perf_counter() - frame[2]
+            if len(stack) > 0:
+                stack[-1][3] += seconds
+            with self.lock:
+                data = self.section_dict.setdefault(name, [0, 0.0, 0.0])
+                data[0] += 1
+                data[1] += seconds
+                data[2] = max(data[2], seconds)
+                self.stack_dict[path] = self.stack_dict.get(path, 0.0) + seconds - frame[3]
+
+    def count(self, name: str, value: int = 1) -> None:
+        """指定した名前のカウンターを増やす"""
+        if not self.enabled:
+            return
+        with self.lock:
+            self.counter_dict[name] = self.counter_dict.get(name, 0) + value
+
+    def profiled(self, name: str) -> Callable[[Callable[..., T]], Callable[..., T]]:
+        """関数の呼び出しを、指定した名前の処理として計測するデコレーター"""
+        def decorator(func: Callable[..., T]) -> Callable[..., T]:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs) -> T:
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with self.section(name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def get_report(self) -> Dict[str, Any]:
+        """集計結果を、所要時間の合計が大きい順に並べて返す"""
+        with self.lock:
+            section_list = [{'name': k, 'count': v[0], 'seconds': v[1], 'max_seconds': v[2],
+                             'mean_seconds': v[1] / v[0] if v[0] > 0 else 0.0}
+                            for k, v in self.section_dict.items()]
+            counter_dict = dict(self.counter_dict)
+        return {
+            'sections': sorted(section_list, key=lambda x: x['seconds'], reverse=True),
+            'counters': dict(sorted(counter_dict.items())),
+        }
+
+    def get_collapsed_stack(self) -> List[str]:
+        """呼び出し経路ごとの所要時間を、collapsed stack形式(1行に「経路 マイクロ秒」)で返す"""
+        with self.lock:
+            stack_dict = dict(self.stack_dict)
+        return [f'{k} {round(v * 1000000)}' for k, v in sorted(stack_dict.items()) if round(v * 1000000) > 0]
+
+    def write_report(self, report_path: str = PROFILE_REPORT_PATH, stack_path: str = PROFILE_STACK_PATH) -> None:
+        """集計結果をファイルに書き込む
+
+        Parameters
+        ----------
+        report_path JSON形式の集計結果の出力先
+        stack_path collapsed stack形式の集計結果の出力先
+        """
+        with open(report_path, 'w', encoding='UTF-8') as f:
+            json.dump(self.get_report(), f, ensure_ascii=False, indent=2)
+        with open(stack_path, 'w', encoding='UTF-8') as f:
+            f.writelines(x + '\n' for x in self.get_collapsed_stack())
+
+
+# プロセス全体で共有する計測用のインスタンス
+profiler = Profiler()
@@ -0,0 +1,61 @@
+import copy
+import threading
+from typing import Iterable, Iterator, Tuple, Dict, List
+
+import lxml
+import requests
+
+from model.DomObject import DomObject
+from model.LxmlDomObject import LxmlDomObject
+from service.http_archive_service import HttpArchiveService
+from service.i_scraping_service import IScrapingService
+from service.lxml_scraping_service import compress_page, get_response_text
+
+
+class ArchiveScrapingService(IScrapingService):
+    """アーカイブに記録した応答だけを返すスクレイピング用のクラス(ネットワークにもキャッシュにもアクセスしない)
+
+    ベンチマークで、Webページの取得時間に左右されずに解析処理を計測するために使う。
+    """
+
+    def __init__(self, archive: HttpArchiveService):
+        """
+        Parameters
+        ----------
+        archive 応答を記録したアーカイブ
+        """
+        # 計測中にアーカイブを読みに行かないよう、最初に全て読み込んでおく
+        self.response_dict: Dict[str, requests.Response] = {x: archive.load(x) for x in archive.get_url_list()}
+        self.lock = threading.Lock()
+        self.page_count = 0
+
+    def _load(self, url: str, encoding: str) -> bytes:
+        """記録した応答の中身を、LxmlScrapingServiceがキャッシュするのと同じバイト列にして返す"""
+        if url not in self.response_dict:
+            raise LookupError(f'アーカイブに記録されていないURLです: {url}')
+        # 文字エンコーディングの指定で記録した応答を書き換えないよう、複製してから解釈する
+        return get_response_text(copy.copy(self.response_dict[url]), encoding)
+
+    def get_page(self, url: str, encoding='', cache=True) -> DomObject:
+        text = self._load(url, encoding)
+        with self.lock:
+            self.page_count += 1
+        return LxmlDomObject(loader=lambda: lxml.html.fromstring(text))
+
+    def get_page_hash(self, url: str, encoding='', cache=True) -> str:
+        return compress_page(self._load(url, encoding))[0]
+
+    def get_pages(self, url_list: Iterable[str], encoding='', cache=True) -> List[DomObject]:
+        return [self.get_page(x, encoding, cache) for x in url_list]
+
+    def iter_pages(self, url_list: Iterable[str], encoding='', cache=True) -> Iterator[Tuple[str, DomObject]]:
+        for url in url_list:
+            yield url, self.get_page(url, encoding, cache)
+
+    def close(self) -> None:
+        pass
+
+    def reset_page_count(self) -> None:
+        """読み込んだWebページの数を0に戻す"""
+        with self.lock:
+            self.page_count = 0
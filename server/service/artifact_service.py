@@ -0,0 +1,244 @@
+import gzip
+import hashlib
+import json
+import os
+from typing import Dict, List, Optional, BinaryIO
+
+import brotli
+
+# ファイル名に付けるハッシュ値の長さ
+HASH_LENGTH = 12
+
+# 論理名と、実際に配信するファイルとの対応を書き込むファイル
+MANIFEST_PATH = 'lens_data.manifest.json'
+
+# 差分パッチの形式の識別子とバージョン
+PATCH_FORMAT = 'lens_data.patch'
+PATCH_VERSION = 1
+
+# 差分パッチの一覧を書き込むファイルと、残しておくパッチの数
+PATCH_INDEX_PATH = 'lens_data.patches.json'
+PATCH_HISTORY_SIZE = 30
+
+
+# ハッシュ値を求める際に、一度に読み込むバイト数
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def write_bytes(file_path: str, data: bytes) -> None:
+    with open(file_path, 'wb') as f:
+        f.write(data)
+
+
+def get_file_hash(file_path: str) -> Optional[str]:
+    """ファイルの中身のSHA-256を、少しずつ読み込みながら求める(存在しなければNone)"""
+    if not os.path.exists(file_path):
+        return None
+    output = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            output.update(chunk)
+    return output.hexdigest()
+
+
+class HashingWriter:
+    """書き込まれた文字列をUTF-8にしてファイルへ書き込みつつ、そのSHA-256を求める"""
+
+    def __init__(self, f: BinaryIO):
+        """
+        Parameters
+        ----------
+        f 書き込み先(バイナリモード)
+        """
+        self.f = f
+        self.hash = hashlib.sha256()
+
+    def write(self, text: str) -> int:
+        data = text.encode('UTF-8')
+        self.hash.update(data)
+        self.f.write(data)
+        return len(text)
+
+    def hexdigest(self) -> str:
+        """これまでに書き込んだ内容のSHA-256を返す"""
+        return self.hash.hexdigest()
+
+
+def publish_artifact(file_path: str, source_path: Optional[str] = None) -> Dict[str, any]:
+    """ファイルを、内容のハッシュ値を付けた名前で保存し、圧縮済みの版も作成する
+
+    Parameters
+    ----------
+    file_path 元のファイルのパス
+    source_path 中身を読み込むファイルのパス(省略時はfile_path。書き込み途中の一時ファイルから作成する場合に使う)
+
+    Returns
+    -------
+        マニフェストに書き込む情報
+    """
+    with open(source_path if source_path is not None else file_path, 'rb') as f:
+        data = f.read()
+    digest = hashlib.sha256(data).hexdigest()
+    directory, file_name = os.path.split(file_path)
+    base_name, ext = os.path.splitext(file_name)
+    hashed_name = f'{base_name}.{digest[:HASH_LENGTH]}{ext}'
+    write_bytes(os.path.join(directory, hashed_name), data)
+    output = {
+        'file': hashed_name,
+        'sha256': digest,
+        'size': len(data),
+        'encodings': {},
+    }
+
+    # 同じ内容なら同じバイト列になるよう、gzipのヘッダーには時刻を入れない
+    compressed_list = [
+        ('gzip', '.gz', gzip.compress(data, compresslevel=9, mtime=0)),
+        ('br', '.br', brotli.compress(data)),
+    ]
+    for encoding, suffix, compressed in compressed_list:
+        write_bytes(os.path.join(directory, hashed_name + suffix), compressed)
+        output['encodings'][encoding] = {'file': hashed_name + suffix, 'size': len(compressed)}
+    return output
+
+
+def get_artifact_file_list(entry: Dict[str, any]) -> List[str]:
+    """マニフェストの1項目が参照しているファイルの一覧を返す"""
+    return [entry['file']] + [x['file'] for x in entry['encodings'].values()]
+
+
+def publish_artifacts(file_path_list: List[str], manifest_path: str = MANIFEST_PATH,
+                      source_path_dict: Optional[Dict[str, str]] = None) -> Dict[str, Dict[str, any]]:
+    """複数のファイルを配信用に保存し、マニフェストを書き込む
+
+    前回のマニフェストが参照していて、今回は参照しなくなったファイルは削除する。
+
+    Parameters
+    ----------
+    file_path_list 元のファイルのパスの一覧
+    manifest_path マニフェストのパス
+    source_path_dict 元のファイルのパスと、実際に中身を読み込むファイルのパスとの対応(無いものは元のファイルから読み込む)
+
+    Returns
+    -------
+        論理名をキーにしたマニフェストの内容
+    """
+    source_path_dict = source_path_dict if source_path_dict is not None else {}
+    manifest = {os.path.basename(x): publish_artifact(x, source_path_dict.get(x)) for x in file_path_list}
+
+    directory = os.path.dirname(manifest_path)
+    if os.path.exists(manifest_path):
+        with open(manifest_path, encoding='UTF-8') as f:
+            old_manifest: Dict[str, Dict[str, any]] = json.load(f)
+        new_file_set = set(y for x in manifest.values() for y in get_artifact_file_list(x))
+        for entry in old_manifest.values():
+            for file_name in get_artifact_file_list(entry):
+                file_path = os.path.join(directory, file_name)
+                if file_name not in new_file_set and os.path.exists(file_path):
+                    os.remove(file_path)
+
+    with open(manifest_path, 'w', encoding='UTF-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+    return manifest
+
+
+def read_bytes(file_path: str) -> Optional[bytes]:
+    """ファイルの中身を読み込む(存在しなければNone)"""
+    if not os.path.exists(file_path):
+        return None
+    with open(file_path, 'rb') as f:
+        return f.read()
+
+
+def get_record_key(record: Dict[str, any]) -> str:
+    """レンズを識別するキーを返す(品番が無いメーカーはレンズ名で識別する)"""
+    product_number = record['product_number']
+    if product_number in ('', 'nan', None):
+        product_number = record['name']
+    return f"{record['maker']}/{record['mount']}/{product_number}"
+
+
+def to_keyed_dict(record_list: List[Dict[str, any]]) -> Dict[str, Dict[str, any]]:
+    """レコードの一覧を、キーをKeyにした辞書に変換する(キーが重複した場合は出現順の番号を付ける)"""
+    output: Dict[str, Dict[str, any]] = {}
+    for record in record_list:
+        key = get_record_key(record)
+        if key in output:
+            index = 2
+            while f'{key}#{index}' in output:
+                index += 1
+            key = f'{key}#{index}'
+        output[key] = record
+    return output
+
+
+def diff_lens_records(old_list: List[Dict[str, any]], new_list: List[Dict[str, any]]) -> Dict[str, any]:
+    """2つのレコードの一覧を比較し、追加・削除・変更されたものを返す
+
+    Parameters
+    ----------
+    old_list 前回のレコードの一覧
+    new_list 今回のレコードの一覧
+
+    Returns
+    -------
+        added(追加されたレコード)・removed(削除されたキー)・changed(キーと変更された項目)を持つ辞書
+    """
+    old_dict = to_keyed_dict(old_list)
+    new_dict = to_keyed_dict(new_list)
+    added = [dict(key=key, record=record) for key, record in new_dict.items() if key not in old_dict]
+    removed = [key for key in old_dict.keys() if key not in new_dict]
+    changed = []
+    for key, record in new_dict.items():
+        if key not in old_dict:
+            continue
+        old_record = old_dict[key]
+        # NaNを含めて比較できるよう、JSON表現で比較する
+        field_dict = {x: y for x, y in record.items() if json.dumps(old_record.get(x)) != json.dumps(y)}
+        if len(field_dict) > 0:
+            changed.append({'key': key, 'fields': field_dict})
+    return {'added': added, 'removed': removed, 'changed': changed}
+
+
+def publish_patch(old_data: Optional[bytes], new_path: str, index_path: str = PATCH_INDEX_PATH) -> Optional[str]:
+    """前回のデータから今回のデータへの差分パッチを作成し、パッチの一覧に追加する
+
+    Parameters
+    ----------
+    old_data 前回のデータ(存在しなければNone)
+    new_path 今回のデータのパス
+    index_path パッチの一覧のパス
+
+    Returns
+    -------
+        作成したパッチのファイル名(変化が無い場合などはNone)
+    """
+    new_data = read_bytes(new_path)
+    old_hash = hashlib.sha256(old_data).hexdigest() if old_data is not None else None
+    new_hash = hashlib.sha256(new_data).hexdigest()
+    directory = os.path.dirname(new_path)
+    index_data = read_bytes(index_path)
+    index = json.loads(index_data) if index_data is not None else {'latest': None, 'patches': []}
+    index['latest'] = new_hash
+    patch_name = None
+    if old_data is not None and old_hash != new_hash:
+        patch = {
+            'format': PATCH_FORMAT,
+            'version': PATCH_VERSION,
+            'from': old_hash,
+            'to': new_hash,
+        }
+        patch.update(diff_lens_records(json.loads(old_data), json.loads(new_data)))
+        patch_name = f'lens_data.patch.{old_hash[:HASH_LENGTH]}-{new_hash[:HASH_LENGTH]}.json'
+        with open(os.path.join(directory, patch_name), 'w', encoding='UTF-8') as f:
+            json.dump(patch, f, ensure_ascii=False, separators=(',', ':'))
+        index['patches'].append({'from': old_hash, 'to': new_hash, 'file': patch_name})
+
+        # 古いパッチは削除する
+        for entry in index['patches'][:-PATCH_HISTORY_SIZE]:
+            file_path = os.path.join(directory, entry['file'])
+            if os.path.exists(file_path):
+                os.remove(file_path)
+        index['patches'] = index['patches'][-PATCH_HISTORY_SIZE:]
+    with open(index_path, 'w', encoding='UTF-8') as f:
+        json.dump(index, f, ensure_ascii=False, indent=2)
+    return patch_name
@@ -0,0 +1,167 @@
+import json
+import threading
+from bisect import bisect_left
+from typing import Dict, List, Any, Optional
+
+from service.fetch_scheduler import get_host
+
+# 応答時間のヒストグラムの区切り(秒)
+LATENCY_BUCKET_LIST = [0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0]
+
+# 計測結果の出力先(JSON形式と、Prometheusのテキスト形式)
+FETCH_METRICS_JSON_PATH = 'fetch_metrics.json'
+FETCH_METRICS_TEXT_PATH = 'fetch_metrics.prom'
+
+
+def escape_label(value: str) -> str:
+    """Prometheusのラベル値として書けるよう、バックスラッシュ・ダブルクォート・改行をエスケープする"""
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class HostMetrics:
+    """1つのホストについての、Webページの取得結果の集計"""
+
+    def __init__(self):
+        self.request_count = 0
+        self.error_count = 0
+        self.response_bytes = 0
+        self.latency_sum = 0.0
+        # 最後の要素は、最も大きい区切りを超えたものの数
+        self.latency_bucket_list = [0] * (len(LATENCY_BUCKET_LIST) + 1)
+        self.status_dict: Dict[int, int] = {}
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'requests': self.request_count,
+            'errors': self.error_count,
+            'response_bytes': self.response_bytes,
+            'latency_sum': self.latency_sum,
+            'latency_mean': self.latency_sum / self.request_count if self.request_count > 0 else 0.0,
+            'latency_buckets': {str(k): v for k, v in zip(LATENCY_BUCKET_LIST + ['+Inf'], self.latency_bucket_list)},
+            'status': {str(k): v for k, v in sorted(self.status_dict.items())},
+        }
+
+
+class FetchMetrics:
+    """Webページの取得について、キャッシュの利用状況とホストごとの応答時間・サイズ・エラー数を集計する"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.cache_hit_count = 0
+        self.cache_miss_count = 0
+        self.not_modified_count = 0
+        self.host_dict: Dict[str, HostMetrics] = {}
+
+    def _get_host(self, url: str) -> HostMetrics:
+        host = get_host(url)
+        if host not in self.host_dict:
+            self.host_dict[host] = HostMetrics()
+        return self.host_dict[host]
+
+    def add_cache_hit(self, count: int = 1) -> None:
+        """キャッシュから返したページの数を加算する"""
+        with self.lock:
+            self.cache_hit_count += count
+
+    def add_cache_miss(self, count: int = 1) -> None:
+        """キャッシュから返せず、取得しに行ったページの数を加算する"""
+        with self.lock:
+            self.cache_miss_count += count
+
+    def add_not_modified(self) -> None:
+        """取得しに行ったが、キャッシュから変化していなかった(304が返った)ページの数を加算する"""
+        with self.lock:
+            self.not_modified_count += 1
+
+    def add_response(self, url: str, seconds: float, status: Optional[int], size: int) -> None:
+        """1回の要求の結果を記録する
+
+        Parameters
+        ----------
+        url 要求したURL
+        seconds 応答までに掛かった時間(秒)
+        status ステータスコード(応答が得られなかった場合はNone)
+        size 応答の本文のバイト数
+        """
+        with self.lock:
+            host = self._get_host(url)
+            host.request_count += 1
+            host.latency_sum += seconds
+            host.latency_bucket_list[bisect_left(LATENCY_BUCKET_LIST, seconds)] += 1
+            host.response_bytes += size
+            if status is None or status >= 400:
+                host.error_count += 1
+            if status is not None:
+                host.status_dict[status] = host.status_dict.get(status, 0) + 1
+
+    def get_hit_ratio(self) -> float:
+        """キャッシュから返したページの割合を返す"""
+        with self.lock:
+            total = self.cache_hit_count + self.cache_miss_count
+            return self.cache_hit_count / total if total > 0 else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """集計結果を辞書にして返す"""
+        hit_ratio = self.get_hit_ratio()
+        with self.lock:
+            return {
+                'cache': {
+                    'hit': self.cache_hit_count,
+                    'miss': self.cache_miss_count,
+                    'not_modified': self.not_modified_count,
+                    'hit_ratio': hit_ratio,
+                },
+                'hosts': {k: v.to_dict() for k, v in sorted(self.host_dict.items())},
+            }
+
+    def to_prometheus_text(self) -> str:
+        """集計結果を、Prometheusのテキスト形式にして返す"""
+        with self.lock:
+            line_list: List[str] = [
+                '# HELP mft_fetch_cache_total Pages served from the page cache (hit) or fetched (miss).',
+                '# TYPE mft_fetch_cache_total counter',
+                f'mft_fetch_cache_total{{result="hit"}} {self.cache_hit_count}',
+                f'mft_fetch_cache_total{{result="miss"}} {self.cache_miss_count}',
+                '# HELP mft_fetch_not_modified_total Fetched pages answered with 304 Not Modified (a subset of miss).',
+                '# TYPE mft_fetch_not_modified_total counter',
+                f'mft_fetch_not_modified_total {self.not_modified_count}',
+                '# HELP mft_fetch_request_seconds Time until a response was received, per host.',
+                '# TYPE mft_fetch_request_seconds histogram',
+            ]
+            host_list = sorted(self.host_dict.items())
+            for name, host in host_list:
+                label = f'host="{escape_label(name)}"'
+                total = 0
+                for bucket, count in zip(LATENCY_BUCKET_LIST + ['+Inf'], host.latency_bucket_list):
+                    total += count
+                    line_list.append(f'mft_fetch_request_seconds_bucket{{{label},le="{bucket}"}} {total}')
+                line_list.append(f'mft_fetch_request_seconds_sum{{{label}}} {host.latency_sum}')
+                line_list.append(f'mft_fetch_request_seconds_count{{{label}}} {host.request_count}')
+            line_list += ['# HELP mft_fetch_response_bytes_total Response body bytes received, per host.',
+                          '# TYPE mft_fetch_response_bytes_total counter']
+            for name, host in host_list:
+                line_list.append(f'mft_fetch_response_bytes_total{{host="{escape_label(name)}"}} {host.response_bytes}')
+            line_list += ['# HELP mft_fetch_errors_total Requests that failed or returned status >= 400, per host.',
+                          '# TYPE mft_fetch_errors_total counter']
+            for name, host in host_list:
+                line_list.append(f'mft_fetch_errors_total{{host="{escape_label(name)}"}} {host.error_count}')
+            line_list += ['# HELP mft_fetch_responses_total Responses received, per host and status code.',
+                          '# TYPE mft_fetch_responses_total counter']
+            for name, host in host_list:
+                for status, count in sorted(host.status_dict.items()):
+                    line_list.append(f'mft_fetch_responses_total{{host="{escape_label(name)}",status="{status}"}}'
+                                     f' {count}')
+        return '\n'.join(line_list) + '\n'
+
+    def write(self, json_path: str = FETCH_METRICS_JSON_PATH, text_path: str = FETCH_METRICS_TEXT_PATH) -> None:
+        """集計結果をファイルに書き込む
+
+        Parameters
+        ----------
+        json_path JSON形式の集計結果の出力先
+        text_path Prometheusのテキスト形式の集計結果の出力先
+        """
+        with open(json_path, 'w', encoding='UTF-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+        with open(text_path, 'w', encoding='UTF-8') as f:
+            f.write(self.to_prometheus_text())
@@ -0,0 +1,105 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from queue import Queue
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple, TypeVar
+from urllib.parse import urlparse
+
+T = TypeVar('T')
+
+
+def get_host(url: str) -> str:
+    """URLからホスト名を取り出す"""
+    return urlparse(url).netloc
+
+
+class FetchScheduler:
+    """ホストごとのアクセス間隔を守りつつ、異なるホストへのアクセスを並列に行うスケジューラ"""
+
+    def __init__(self, interval: float = 1.0, max_workers: int = 16):
+        """
+        Parameters
+        ----------
+        interval 同一ホストへのアクセス間隔(秒)
+        max_workers 同時に動かすワーカースレッドの最大数
+        """
+        self.interval = interval
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='fetch')
+        self.lock = threading.Lock()
+        self.host_lock_dict: Dict[str, threading.Lock] = {}
+        self.host_last_access_dict: Dict[str, float] = {}
+
+    def _get_host_lock(self, host: str) -> threading.Lock:
+        with self.lock:
+            if host not in self.host_lock_dict:
+                self.host_lock_dict[host] = threading.Lock()
+            return self.host_lock_dict[host]
+
+    @contextmanager
+    def host_slot(self, url: str):
+        """指定したURLのホストへアクセスしてよいタイミングまで待ち、アクセス中はそのホストを占有する
+
+        Parameters
+        ----------
+        url アクセスするURL
+        """
+        host = get_host(url)
+        with self._get_host_lock(host):
+            last_access = self.host_last_access_dict.get(host)
+            if last_access is not None:
+                wait_time = last_access + self.interval - time.monotonic()
+                if wait_time > 0:
+                    time.sleep(wait_time)
+            try:
+                yield
+            finally:
+                self.host_last_access_dict[host] = time.monotonic()
+
+    def map_as_completed(self, func: Callable[[str], T], url_list: Iterable[str]) -> Iterator[Tuple[str, T]]:
+        """URLの一覧をホストごとに振り分けて並列に処理し、終わったものから順に返す
+
+        Parameters
+        ----------
+        func URLを受け取って処理する関数
+        url_list URLの一覧
+
+        Returns
+        -------
+            (URL, 処理結果)を処理が終わった順に返すイテレーター
+        """
+        url_list = list(url_list)
+        host_url_dict: Dict[str, List[str]] = {}
+        for url in url_list:
+            host_url_dict.setdefault(get_host(url), []).append(url)
+
+        result_queue: Queue = Queue()
+        # エラーが起きたり途中で打ち切られたりした場合に、残りのURLを処理させないためのフラグ
+        stop_event = threading.Event()
+
+        def worker(host_url_list: List[str]):
+            # 同一ホストのURLは1つのワーカーが順番に処理する
+            for url2 in host_url_list:
+                if stop_event.is_set():
+                    return
+                try:
+                    result_queue.put((url2, func(url2), None))
+                except Exception as e:
+                    result_queue.put((url2, None, e))
+
+        future_list = [self.executor.submit(worker, x) for x in host_url_dict.values()]
+        try:
+            for _ in range(0, len(url_list)):
+                url, result, error = result_queue.get()
+                if error is not None:
+                    raise error
+                yield url, result
+        finally:
+            # 待ち行列に残っているワーカーは取り消し、動いているワーカーは処理中のURLで止める
+            stop_event.set()
+            for future in future_list:
+                future.cancel()
+
+    def shutdown(self) -> None:
+        """ワーカースレッドを終了させる(まだ始まっていない処理は取り消す)"""
+        self.executor.shutdown(wait=True, cancel_futures=True)
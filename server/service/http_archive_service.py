@@ -0,0 +1,80 @@
+import json
+import time
+import zlib
+from typing import Optional, Dict, List
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from service.i_database_service import IDataBaseService
+
+# アーカイブの形式の識別子とバージョン(形式を変えた場合はバージョンを上げる)
+ARCHIVE_FORMAT = 'mft-db-tool.http_archive'
+ARCHIVE_VERSION = 1
+
+
+class HttpArchiveService:
+    """HTTPの要求・応答を記録し、後からネットワークにアクセスせず再生するためのアーカイブ"""
+
+    def __init__(self, database: IDataBaseService):
+        """
+        Parameters
+        ----------
+        database アーカイブを保存するデータベース
+        """
+        self.database = database
+        self.database.many_query([
+            'CREATE TABLE IF NOT EXISTS archive_info (key TEXT PRIMARY KEY, value TEXT)',
+            'CREATE TABLE IF NOT EXISTS exchange (url TEXT PRIMARY KEY, status INTEGER, headers TEXT, encoding TEXT,'
+            ' body BLOB, recorded_at REAL)',
+        ])
+        info_dict: Dict[str, str] = {x['key']: x['value']
+                                     for x in self.database.select('SELECT key, value FROM archive_info')}
+        if len(info_dict) == 0:
+            self.database.many_query(['INSERT INTO archive_info (key, value) VALUES (?, ?)'] * 3, [
+                ('format', ARCHIVE_FORMAT),
+                ('version', str(ARCHIVE_VERSION)),
+                ('created_at', str(time.time())),
+            ])
+        elif info_dict.get('format') != ARCHIVE_FORMAT or info_dict.get('version') != str(ARCHIVE_VERSION):
+            raise ValueError(f"未対応のアーカイブです: {info_dict.get('format')} (version {info_dict.get('version')})")
+
+    def save(self, url: str, response: requests.Response) -> None:
+        """応答を記録する(同じURLを記録し直した場合は上書きする)
+
+        Parameters
+        ----------
+        url 要求したURL
+        response 応答
+        """
+        self.database.query('INSERT OR REPLACE INTO exchange (url, status, headers, encoding, body, recorded_at)'
+                            ' VALUES (?, ?, ?, ?, ?, ?)',
+                            (url, response.status_code, json.dumps(dict(response.headers), ensure_ascii=False),
+                             response.encoding, zlib.compress(response.content), time.time()))
+
+    def load(self, url: str) -> Optional[requests.Response]:
+        """記録した応答を返す
+
+        Parameters
+        ----------
+        url 要求するURL
+
+        Returns
+        -------
+            記録した時と同じ内容の応答(記録されていなければNone)
+        """
+        record_list = self.database.select('SELECT status, headers, encoding, body FROM exchange WHERE url=?', (url,))
+        if len(record_list) == 0:
+            return None
+        record = record_list[0]
+        response = requests.Response()
+        response.url = url
+        response.status_code = record['status']
+        response.headers = CaseInsensitiveDict(json.loads(record['headers']))
+        response.encoding = record['encoding']
+        response._content = zlib.decompress(record['body'])
+        return response
+
+    def get_url_list(self) -> List[str]:
+        """記録されているURLの一覧を返す"""
+        return [x['url'] for x in self.database.select('SELECT url FROM exchange ORDER BY url')]
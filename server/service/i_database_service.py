@@ -1,5 +1,5 @@
 from abc import ABCMeta, abstractmethod
-from typing import List, Dict
+from typing import List, Dict, Iterator
 
 
 class IDataBaseService(metaclass=ABCMeta):
@@ -11,6 +11,23 @@ class IDataBaseService(metaclass=ABCMeta):
     def select(self, query: str, parameter=()) -> List[Dict[str, any]]:
         pass
 
+    @abstractmethod
+    def select_iter(self, query: str, parameter=(), batch_size: int = 1000, row_type: str = 'dict') -> Iterator[any]:
+        """SELECT文の結果を、一定件数ずつ読み込みながら1行ずつ返す
+
+        Parameters
+        ----------
+        query SQL文
+        parameter SQL文のパラメーター
+        batch_size 一度に読み込む行数
+        row_type 各行の形式('dict'なら辞書、'tuple'ならタプル、'row'ならカラム名でも参照できる行オブジェクト)
+
+        Returns
+        -------
+            各行を返すイテレーター
+        """
+        pass
+
     @abstractmethod
     def query(self, query: str, parameter=()) -> None:
         self.many_query([query], [parameter])
@@ -18,3 +35,13 @@ class IDataBaseService(metaclass=ABCMeta):
     @abstractmethod
     def many_query(self, query: List[str], parameter=None) -> None:
         pass
+
+    @abstractmethod
+    def close(self) -> None:
+        pass
+
+    def __enter__(self) -> 'IDataBaseService':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
@@ -1,4 +1,5 @@
 from abc import abstractmethod, ABCMeta
+from typing import Iterable, Iterator, Tuple, List
 
 from model import DomObject
 
@@ -21,3 +22,56 @@ class IScrapingService(metaclass=ABCMeta):
             DOM[オブジェクト
         """
         pass
+
+    @abstractmethod
+    def get_page_hash(self, url: str, encoding='', cache=True) -> str:
+        """Webページの内容のハッシュ値を、DOMオブジェクトを作らずに取得する
+
+        Parameters
+        ----------
+        url URL
+        encoding 文字エンコーディング(空文字列なら自動判定)
+        cache キャッシュをONにするならTrue
+
+        Returns
+        -------
+            内容のハッシュ値
+        """
+        pass
+
+    @abstractmethod
+    def get_pages(self, url_list: Iterable[str], encoding='', cache=True) -> List[DomObject]:
+        """複数のWebページのDOMオブジェクトをまとめて取得する
+
+        Parameters
+        ----------
+        url_list URLの一覧
+        encoding 文字エンコーディング(空文字列なら自動判定)
+        cache キャッシュをONにするならTrue
+
+        Returns
+        -------
+            URLの一覧と同じ順番に並べたDOMオブジェクトの一覧
+        """
+        pass
+
+    @abstractmethod
+    def iter_pages(self, url_list: Iterable[str], encoding='', cache=True) -> Iterator[Tuple[str, DomObject]]:
+        """複数のWebページのDOMオブジェクトをまとめて取得する
+
+        Parameters
+        ----------
+        url_list URLの一覧
+        encoding 文字エンコーディング(空文字列なら自動判定)
+        cache キャッシュをONにするならTrue
+
+        Returns
+        -------
+            (URL, DOMオブジェクト)を取得できた順に返すイテレーター
+        """
+        pass
+
+    @abstractmethod
+    def close(self) -> None:
+        """内部で使用しているスレッドなどを解放する"""
+        pass
@@ -0,0 +1,270 @@
+import base64
+import hashlib
+import io
+import json
+import math
+import os
+import re
+import sys
+from array import array
+from dataclasses import fields
+from typing import List, Dict, Callable, Iterator, TextIO
+
+import pandas
+from pandas import DataFrame
+
+from constant import Lens
+
+# 出力するLensの列(idは出力時に既定値で埋める)
+LENS_COLUMN_LIST: List[str] = [x.name for x in fields(Lens) if x.name != 'id']
+
+# 列指向形式の識別子とバージョン(形式を変えた場合はバージョンを上げる)
+COLUMNAR_FORMAT = 'lens_data.columnar'
+COLUMNAR_VERSION = 1
+
+# 列指向形式で、辞書符号化する文字列の列
+COLUMNAR_DICTIONARY_COLUMN_LIST = ['maker', 'mount']
+
+# 列指向形式で、数値の列を詰め込む型(arrayモジュールの型コード, 出力時の型名)
+COLUMNAR_ARRAY_TYPE_DICT = {int: ('i', 'int32'), float: ('d', 'float64'), bool: ('B', 'uint8')}
+
+# 分割したファイルの一覧を書き込むファイル
+SHARD_MANIFEST_PATH = 'lens_data.shards.json'
+
+# 分割したファイルの名前に使う、マウント名の表記
+MOUNT_SLUG_DICT = {'マイクロフォーサーズ': 'mft', 'ライカL': 'leica-l'}
+
+# マウント名・メーカー名が無いレコードをまとめたファイルの名前に使う表記
+UNKNOWN_SHARD_SLUG = 'unknown'
+
+# JSONに出力する際のキーの並び順(従来のsort_keys=Trueと同じ)
+LENS_JSON_KEY_LIST: List[str] = sorted(x.name for x in fields(Lens))
+
+
+# 出力時のレコードの並び順を決める列(取得順に依らず、同じデータなら同じ出力になるようにする)
+LENS_SORT_COLUMN_LIST = ['maker', 'mount', 'product_number', 'name']
+
+# 実数を出力する際の有効桁数(計算誤差による末尾の揺れで出力が変わらないようにする)
+FLOAT_SIGNIFICANT_DIGITS = 12
+
+
+def to_bool(value: any) -> bool:
+    return bool(value)
+
+
+def to_float(value: any) -> float:
+    # 「-0.0」は「0.0」に揃える
+    return float(f'{float(value):.{FLOAT_SIGNIFICANT_DIGITS}g}') + 0.0
+
+
+# Lensの各列の型変換(Lens.from_dictとLens.schema().dumpsを通した場合と同じ型になる。
+# ただし実数は、出力が揺れないようFLOAT_SIGNIFICANT_DIGITS桁に丸めるので、値は完全には一致しない)
+LENS_CONVERTER_DICT: Dict[str, Callable[[any], any]] = {
+    x.name: {int: int, float: to_float, bool: to_bool, str: str}[x.type] for x in fields(Lens)
+}
+
+
+def merge_lens_data(df_list: List[DataFrame]) -> DataFrame:
+    """メーカーごとの整形結果を一度に結合し、Lensの列だけを持つDataFrameにする
+
+    Parameters
+    ----------
+    df_list メーカーごとの整形結果
+
+    Returns
+    -------
+        結合後のDataFrame(どのメーカーも持っていない列は空文字列で埋め、レコードはLENS_SORT_COLUMN_LISTの順に並べる)
+    """
+    if len(df_list) == 0:
+        return DataFrame(columns=LENS_COLUMN_LIST)
+    df = pandas.concat(df_list, ignore_index=True)
+    df = df.reindex(columns=LENS_COLUMN_LIST, fill_value='')
+    return df.sort_values(LENS_SORT_COLUMN_LIST, key=lambda x: x.astype(str), kind='mergesort', ignore_index=True)
+
+
+def iter_lens_records(df: DataFrame) -> Iterator[Dict[str, any]]:
+    """結合後のDataFrameから、出力用に型変換したレコードを1件ずつ返す
+
+    Parameters
+    ----------
+    df 結合後のDataFrame
+
+    Returns
+    -------
+        キーをLENS_JSON_KEY_LISTの順に並べたレコードを返すイテレーター
+    """
+    default_dict = Lens().to_dict()
+    default_record = {x: default_dict[x] for x in LENS_JSON_KEY_LIST}
+    column_list = [x for x in LENS_JSON_KEY_LIST if x in df.columns]
+    for row in df[column_list].itertuples(index=False, name=None):
+        record = default_record.copy()
+        for key, value in zip(column_list, row):
+            record[key] = None if value is None else LENS_CONVERTER_DICT[key](value)
+        yield record
+
+
+def write_lens_json(df: DataFrame, f: TextIO, compact: bool = False) -> None:
+    """結合後のDataFrameを、1レコードずつJSONに変換しながらファイルに書き込む
+
+    Parameters
+    ----------
+    df 結合後のDataFrame
+    f 書き込み先
+    compact インデントや空白を入れずに書き込むならTrue
+    """
+    first = True
+    for record in iter_lens_records(df):
+        if compact:
+            f.write('[' if first else ',')
+            f.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')))
+        else:
+            f.write('[\n' if first else ',\n')
+            text = json.dumps(record, ensure_ascii=False, indent=2)
+            f.write('  ' + text.replace('\n', '\n  '))
+        first = False
+    if first:
+        f.write('[]')
+    else:
+        f.write(']' if compact else '\n]')
+
+
+def pack_array(type_code: str, value_list: List[any]) -> str:
+    """数値の一覧をリトルエンディアンの型付き配列にして、Base64文字列で返す"""
+    data = array(type_code, value_list)
+    if sys.byteorder != 'little':
+        data.byteswap()
+    return base64.b64encode(data.tobytes()).decode('ascii')
+
+
+def write_lens_columnar(df: DataFrame, f: TextIO) -> None:
+    """結合後のDataFrameを、列ごとに配列へまとめた形式でファイルに書き込む
+
+    makerとmountは辞書符号化し、数値と真偽値の列はBase64にした型付き配列として持つ。
+    数値の列で値がNoneだった行は、nullの一覧に行番号を記録する。
+
+    Parameters
+    ----------
+    df 結合後のDataFrame
+    f 書き込み先
+    """
+    value_dict: Dict[str, List[any]] = {x: [] for x in LENS_JSON_KEY_LIST}
+    for record in iter_lens_records(df):
+        for key, value in record.items():
+            value_dict[key].append(value)
+
+    type_dict = {x.name: x.type for x in fields(Lens)}
+    column_dict: Dict[str, Dict[str, any]] = {}
+    for key, value_list in value_dict.items():
+        if key in COLUMNAR_DICTIONARY_COLUMN_LIST:
+            dictionary = list(dict.fromkeys(value_list))
+            code_dict = {x: i for i, x in enumerate(dictionary)}
+            type_code, type_name = ('B', 'uint8') if len(dictionary) <= 256 else ('H', 'uint16')
+            column_dict[key] = {'type': 'dictionary', 'index_type': type_name, 'dictionary': dictionary,
+                                'data': pack_array(type_code, [code_dict[x] for x in value_list])}
+        elif type_dict[key] in COLUMNAR_ARRAY_TYPE_DICT:
+            type_code, type_name = COLUMNAR_ARRAY_TYPE_DICT[type_dict[key]]
+            null_list = [i for i, x in enumerate(value_list) if x is None]
+            if type_code == 'd':
+                value_list = [math.nan if x is None else x for x in value_list]
+            else:
+                value_list = [0 if x is None else x for x in value_list]
+            column_dict[key] = {'type': type_name, 'data': pack_array(type_code, value_list)}
+            if len(null_list) > 0:
+                column_dict[key]['null'] = null_list
+        else:
+            column_dict[key] = {'type': 'string', 'data': value_list}
+
+    output = {
+        'format': COLUMNAR_FORMAT,
+        'version': COLUMNAR_VERSION,
+        'count': len(df),
+        'columns': column_dict,
+    }
+    json.dump(output, f, ensure_ascii=False, separators=(',', ':'))
+
+
+def get_shard_slug(name: str) -> str:
+    """マウント名・メーカー名から、ファイル名に使える表記を作成する(空文字列ならUNKNOWN_SHARD_SLUG)"""
+    if name == '':
+        return UNKNOWN_SHARD_SLUG
+    if name in MOUNT_SLUG_DICT:
+        return MOUNT_SLUG_DICT[name]
+    slug = re.sub(r'[^a-z0-9]+', '-', name.lower()).strip('-')
+    if slug == '':
+        slug = hashlib.sha256(name.encode('UTF-8')).hexdigest()[:12]
+    return slug
+
+
+def get_shard_slug_dict(name_list: List[str]) -> Dict[str, str]:
+    """マウント名・メーカー名ごとに、ファイル名に使える表記を作成する
+
+    異なる名前が同じ表記になった場合は、後から書き込んだファイルで上書きしないよう、
+    それらの名前全てに名前のハッシュ値を付けて区別する(処理する順番によらず同じ表記になる)。
+
+    Parameters
+    ----------
+    name_list マウント名・メーカー名の一覧
+
+    Returns
+    -------
+        名前をキーにした、ファイル名に使える表記の辞書
+    """
+    slug_dict = {x: get_shard_slug(x) for x in name_list}
+    slug_count: Dict[str, int] = {}
+    for slug in slug_dict.values():
+        slug_count[slug] = slug_count.get(slug, 0) + 1
+    return {k: v if slug_count[v] == 1 else f"{v}-{hashlib.sha256(k.encode('UTF-8')).hexdigest()[:8]}"
+            for k, v in slug_dict.items()}
+
+
+def write_lens_shards(df: DataFrame, directory: str = '.', manifest_path: str = SHARD_MANIFEST_PATH) \
+        -> Dict[str, any]:
+    """結合後のDataFrameを、マウントごと・メーカーごとに分割して書き込み、一覧をマニフェストに書き込む
+
+    前回のマニフェストが参照していて、今回は参照しなくなったファイルは削除する。
+
+    Parameters
+    ----------
+    df 結合後のDataFrame
+    directory 分割したファイルの書き込み先
+    manifest_path マニフェストのパス
+
+    Returns
+    -------
+        マニフェストの内容
+    """
+    manifest: Dict[str, any] = {'count': len(df)}
+    for column in ['mount', 'maker']:
+        shard_list: List[Dict[str, any]] = []
+        # 名前が無いレコードも、どのファイルからも漏れないよう空文字列の名前としてまとめる
+        name_series = df[column].where(df[column].notna(), '')
+        slug_dict = get_shard_slug_dict(name_series.unique().tolist())
+        for name, df2 in df.groupby(name_series, sort=False, dropna=False):
+            f = io.StringIO()
+            write_lens_json(df2, f, compact=True)
+            data = f.getvalue().encode('UTF-8')
+            file_name = f'lens_data.{column}.{slug_dict[name]}.json'
+            with open(os.path.join(directory, file_name), 'wb') as f2:
+                f2.write(data)
+            shard_list.append({
+                'name': name if name != '' else None,
+                'file': file_name,
+                'count': len(df2),
+                'sha256': hashlib.sha256(data).hexdigest(),
+                'size': len(data),
+            })
+        manifest[column] = shard_list
+
+    if os.path.exists(manifest_path):
+        with open(manifest_path, encoding='UTF-8') as f:
+            old_manifest: Dict[str, any] = json.load(f)
+        new_file_set = set(x['file'] for column in ['mount', 'maker'] for x in manifest[column])
+        for column in ['mount', 'maker']:
+            for entry in old_manifest.get(column, []):
+                file_path = os.path.join(directory, entry['file'])
+                if entry['file'] not in new_file_set and os.path.exists(file_path):
+                    os.remove(file_path)
+
+    with open(manifest_path, 'w', encoding='UTF-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return manifest
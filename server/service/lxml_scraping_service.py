@@ -1,33 +1,225 @@
+import hashlib
 import time
+import zlib
+from typing import Iterable, Iterator, Tuple, Optional, Dict, Union, List
 
 import lxml
 import requests
 
 from model import DomObject
 from model.LxmlDomObject import LxmlDomObject
+from service.fetch_metrics import FetchMetrics
+from service.fetch_scheduler import FetchScheduler
+from service.http_archive_service import HttpArchiveService
 from service.i_scraping_service import IScrapingService
 from service.i_database_service import IDataBaseService
+from profiler import profiler
+
+
+def compress_page(text: Union[bytes, str]) -> Tuple[str, bytes]:
+    """ページの中身を圧縮し、(内容のハッシュ値, 圧縮後のデータ)を返す"""
+    if isinstance(text, str):
+        text = text.encode('UTF-8')
+    return hashlib.sha256(text).hexdigest(), zlib.compress(text)
+
+
+def get_response_text(response: requests.Response, encoding: str = '') -> bytes:
+    """応答の中身を、指定した文字エンコーディングで解釈し直したバイト列にする(解釈できない文字は取り除く)"""
+    if encoding != '':
+        response.encoding = encoding
+    return response.text.encode(response.encoding, 'ignore').decode(response.encoding, 'ignore') \
+        .encode(response.encoding, 'ignore')
+
+
+def create_dom_object(body: bytes) -> DomObject:
+    """圧縮されたページから、初めて参照した際に展開・解析するDOMオブジェクトを作成する"""
+    return LxmlDomObject(loader=lambda: lxml.html.fromstring(zlib.decompress(body)))
+
+
+# 1回の問い合わせで指定するURLの最大数
+SELECT_CHUNK_SIZE = 500
+
+# 古い形式のキャッシュを移行する際、一度に処理する行数
+MIGRATION_BATCH_SIZE = 100
+
+# 動作モード(通常・アーカイブへの記録・アーカイブからの再生)
+MODE_LIVE = 'live'
+MODE_RECORD = 'record'
+MODE_REPLAY = 'replay'
 
 
 class LxmlScrapingService(IScrapingService):
     """スクレイピング用のラッパークラス"""
 
-    def __init__(self, database: IDataBaseService):
+    def __init__(self, database: IDataBaseService, scheduler: Optional[FetchScheduler] = None, mode: str = MODE_LIVE,
+                 archive: Optional[HttpArchiveService] = None):
+        """
+        Parameters
+        ----------
+        database キャッシュを保存するデータベース
+        scheduler ダウンロードの順番を決めるスケジューラ
+        mode 動作モード。MODE_RECORDではキャッシュを使わずに全てダウンロードしてアーカイブに記録し、
+             MODE_REPLAYではネットワークにアクセスせずアーカイブから読み込む
+        archive 記録・再生に使うアーカイブ
+        """
+        if mode not in (MODE_LIVE, MODE_RECORD, MODE_REPLAY):
+            raise ValueError(f'未対応の動作モードです: {mode}')
+        if mode != MODE_LIVE and archive is None:
+            raise ValueError(f'{mode}モードにはアーカイブが必要です')
         self.database = database
-        self.database.query('CREATE TABLE IF NOT EXISTS page_cache (url TEXT PRIMARY KEY, text TEXT)')
+        self.scheduler = scheduler if scheduler is not None else FetchScheduler()
+        self.mode = mode
+        self.archive = archive
+        # ページの中身は、内容のハッシュ値をキーにして圧縮した状態で保存する
+        self.database.query('CREATE TABLE IF NOT EXISTS page_blob (hash TEXT PRIMARY KEY, body BLOB)')
+        column_set = set(x['name'] for x in self.database.select('PRAGMA table_info(page_cache)'))
+        if 'text' in column_set:
+            self._migrate_page_cache(column_set)
+        self.database.query('CREATE TABLE IF NOT EXISTS page_cache (url TEXT PRIMARY KEY, hash TEXT, etag TEXT,'
+                            ' last_modified TEXT, fetched_at REAL)')
+        self.metrics = FetchMetrics()
 
-    def get_page(self, url: str, encoding='', cache=True) -> DomObject:
-        cache_data = self.database.select('SELECT text from page_cache WHERE url=?', (url,))
-        if len(cache_data) == 0 or not cache:
-            response = requests.get(url)
-            if encoding != '':
-                response.encoding = encoding
-            text = response.text.encode(response.encoding, 'ignore').decode(response.encoding, 'ignore') \
-                .encode(response.encoding, 'ignore')
-            time.sleep(1)
-            if cache:
-                print(f'caching... [{url}]')
-                self.database.query('INSERT INTO page_cache (url, text) VALUES (?, ?)', (url, text))
-            return LxmlDomObject(lxml.html.fromstring(text))
+    def _migrate_page_cache(self, column_set) -> None:
+        """ページの中身をそのまま持つ古い形式のpage_cacheテーブルを、圧縮形式に移行する"""
+        print('migrating page_cache...')
+        self.database.many_query(['DROP TABLE IF EXISTS page_cache_new',
+                                  'CREATE TABLE page_cache_new (url TEXT PRIMARY KEY, hash TEXT, etag TEXT,'
+                                  ' last_modified TEXT, fetched_at REAL)'])
+        columns = ', '.join(x if x in column_set else f'NULL AS {x}'
+                            for x in ['etag', 'last_modified', 'fetched_at'])
+        # ページ全体をメモリに載せないよう、少しずつ読み込んで書き込む
+        query_list: List[str] = []
+        parameter_list: List[tuple] = []
+        for record in self.database.select_iter(f'SELECT url, text, {columns} FROM page_cache',
+                                                batch_size=MIGRATION_BATCH_SIZE, row_type='tuple'):
+            page_hash, body = compress_page(record[1])
+            query_list.append('INSERT OR IGNORE INTO page_blob (hash, body) VALUES (?, ?)')
+            parameter_list.append((page_hash, body))
+            query_list.append('INSERT INTO page_cache_new (url, hash, etag, last_modified, fetched_at)'
+                              ' VALUES (?, ?, ?, ?, ?)')
+            parameter_list.append((record[0], page_hash, *record[2:]))
+            if len(query_list) >= MIGRATION_BATCH_SIZE * 2:
+                self.database.many_query(query_list, parameter_list)
+                query_list, parameter_list = [], []
+        query_list += ['DROP TABLE page_cache', 'ALTER TABLE page_cache_new RENAME TO page_cache']
+        parameter_list += [(), ()]
+        self.database.many_query(query_list, parameter_list)
+        self.database.query('VACUUM')
+
+    def _select_cache(self, url_list: List[str], with_body=True) -> Dict[str, Dict[str, any]]:
+        """キャッシュされているページを、URLをキーにした辞書としてまとめて取得する"""
+        if with_body:
+            query = 'SELECT url, page_cache.hash, body, etag, last_modified FROM page_cache' \
+                    ' INNER JOIN page_blob ON page_cache.hash = page_blob.hash'
         else:
-            return LxmlDomObject(lxml.html.fromstring(cache_data[0]['text']))
+            query = 'SELECT url, hash, etag, last_modified FROM page_cache'
+        output: Dict[str, Dict[str, any]] = {}
+        # SQLiteのパラメーター数上限に引っかからないよう、分割して問い合わせる
+        for i in range(0, len(url_list), SELECT_CHUNK_SIZE):
+            chunk = url_list[i:i + SELECT_CHUNK_SIZE]
+            placeholder = ', '.join(['?'] * len(chunk))
+            for record in self.database.select(f'{query} WHERE url IN ({placeholder})', tuple(chunk)):
+                output[record['url']] = record
+        return output
+
+    def _use_cache(self, cache: bool) -> bool:
+        """キャッシュから読み込んでよいかを返す(記録時は、全ての応答を記録するためキャッシュを使わない)"""
+        return cache and self.mode != MODE_RECORD
+
+    @profiler.profiled('get_page')
+    def get_page(self, url: str, encoding='', cache=True) -> DomObject:
+        cache_data = list(self._select_cache([url]).values())
+        if len(cache_data) > 0 and self._use_cache(cache):
+            self.metrics.add_cache_hit()
+            return create_dom_object(cache_data[0]['body'])
+        return create_dom_object(self._download(url, encoding, cache, cache_data)[1])
+
+    @profiler.profiled('get_page_hash')
+    def get_page_hash(self, url: str, encoding='', cache=True) -> str:
+        cache_data = list(self._select_cache([url], with_body=False).values())
+        # ハッシュ値を調べるだけでページは返さないので、キャッシュの利用状況には数えない
+        if len(cache_data) > 0 and self._use_cache(cache):
+            return cache_data[0]['hash']
+        return self._download(url, encoding, cache, cache_data)[0]
+
+    @profiler.profiled('download')
+    def _download(self, url: str, encoding: str, cache: bool, cache_data: List[Dict[str, any]]) \
+            -> Tuple[str, Optional[bytes]]:
+        """Webページをダウンロードしてキャッシュに保存し、(内容のハッシュ値, 圧縮後のデータ)を返す"""
+        self.metrics.add_cache_miss()
+        response = self._request(url, cache_data)
+        if response.status_code == 304 and len(cache_data) > 0:
+            self.metrics.add_not_modified()
+            self.database.query('UPDATE page_cache SET fetched_at=? WHERE url=?', (time.time(), url))
+            return cache_data[0]['hash'], cache_data[0].get('body')
+
+        profiler.count('download_bytes', len(response.content))
+        page_hash, body = compress_page(get_response_text(response, encoding))
+        old_hash = cache_data[0]['hash'] if len(cache_data) > 0 else None
+        if cache:
+            print(f'caching... [{url}]')
+        self.database.many_query([
+            'INSERT OR IGNORE INTO page_blob (hash, body) VALUES (?, ?)',
+            'INSERT OR REPLACE INTO page_cache (url, hash, etag, last_modified, fetched_at) VALUES (?, ?, ?, ?, ?)',
+            'DELETE FROM page_blob WHERE hash=? AND hash NOT IN (SELECT hash FROM page_cache)',
+        ], [
+            (page_hash, body),
+            (url, page_hash, response.headers.get('ETag'), response.headers.get('Last-Modified'), time.time()),
+            (old_hash,),
+        ])
+        return page_hash, body
+
+    def _request(self, url: str, cache_data: List[Dict[str, any]]) -> requests.Response:
+        """動作モードに応じて、ネットワークかアーカイブから応答を取得する"""
+        if self.mode == MODE_REPLAY:
+            response = self.archive.load(url)
+            if response is None:
+                raise LookupError(f'アーカイブに記録されていないURLです: {url}')
+            return response
+
+        # キャッシュがあれば、条件付きリクエストで更新の有無を問い合わせる
+        # (記録時は、再生時にキャッシュが無くても読み込めるよう、常に中身ごと取得する)
+        headers: Dict[str, str] = {}
+        if len(cache_data) > 0 and self.mode != MODE_RECORD:
+            if cache_data[0]['etag'] is not None:
+                headers['If-None-Match'] = cache_data[0]['etag']
+            if cache_data[0]['last_modified'] is not None:
+                headers['If-Modified-Since'] = cache_data[0]['last_modified']
+        with self.scheduler.host_slot(url), profiler.section('requests.get'):
+            # ホストごとのアクセス間隔を待つ時間は含めず、応答までの時間だけを計測する
+            start = time.perf_counter()
+            try:
+                response = requests.get(url, headers=headers)
+            except requests.RequestException:
+                self.metrics.add_response(url, time.perf_counter() - start, None, 0)
+                raise
+            self.metrics.add_response(url, time.perf_counter() - start, response.status_code, len(response.content))
+        if self.mode == MODE_RECORD:
+            self.archive.save(url, response)
+        return response
+
+    def get_pages(self, url_list: Iterable[str], encoding='', cache=True) -> List[DomObject]:
+        url_list = list(url_list)
+        page_dict: Dict[str, DomObject] = dict(self.iter_pages(url_list, encoding, cache))
+        return [page_dict[x] for x in url_list]
+
+    def iter_pages(self, url_list: Iterable[str], encoding='', cache=True) -> Iterator[Tuple[str, DomObject]]:
+        url_list = list(url_list)
+        cache_dict = self._select_cache(url_list)
+
+        # キャッシュにあるものは即座に返し、無いものだけダウンロードする
+        miss_url_list: List[str] = []
+        for url in url_list:
+            if self._use_cache(cache) and url in cache_dict:
+                self.metrics.add_cache_hit()
+                yield url, create_dom_object(cache_dict[url]['body'])
+            else:
+                miss_url_list.append(url)
+
+        def download(x: str) -> DomObject:
+            cache_data = [cache_dict[x]] if x in cache_dict else []
+            return create_dom_object(self._download(x, encoding, cache, cache_data)[1])
+        yield from self.scheduler.map_as_completed(download, miss_url_list)
+
+    def close(self) -> None:
+        self.scheduler.shutdown()
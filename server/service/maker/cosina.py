@@ -1,10 +1,13 @@
 from decimal import Decimal
 from typing import List, Tuple, Dict
 
+import numpy
 from pandas import DataFrame
 
 from service.i_scraping_service import IScrapingService
-from service.ulitity import extract_numbers, regex
+from service.maker_registry import register_maker, MakerPlugin
+from service.ulitity import extract_numbers, extract_number_arrays, regex, parse_spec_values, to_int_array, \
+    check_number_array
 
 lens_name_table = {
     '10.5mm F0.95': 'Voigtlander NOKTON 10.5mm F0.95 Aspherical',
@@ -16,7 +19,7 @@ lens_name_table = {
 }
 
 
-def get_cosina_lens_list(scraping: IScrapingService) -> DataFrame:
+def discover_cosina_lens_list(scraping: IScrapingService) -> List[Tuple[str, str]]:
     # レンズのURL一覧を取得する
     lens_list: List[Tuple[str, str]] = []
     page = scraping.get_page('http://www.cosina.co.jp/seihin/voigtlander/mft-mount/index.html',
@@ -30,10 +33,14 @@ def get_cosina_lens_list(scraping: IScrapingService) -> DataFrame:
                 raise Exception('未対応のレンズが含まれています')
             lens_list.append((lens_name_table[lens_name], lens_url))
 
+    return lens_list
+
+
+def fetch_cosina_lens_list(scraping: IScrapingService, lens_list: List[Tuple[str, str]]) -> List[Dict[str, any]]:
     # レンズの情報を取得する
+    page_list = scraping.get_pages([x[1] for x in lens_list], encoding='cp932')
     temp_list: List[Dict[str, any]] = []
-    for lens_name, lens_url in lens_list:
-        page = scraping.get_page(lens_url, encoding='cp932')
+    for (lens_name, lens_url), page in zip(lens_list, page_list):
         temp: Dict[str, str] = {'レンズ名': lens_name, 'URL': lens_url}
         for tr_element in page.find_all('tr'):
             td_elements = tr_element.find_all('td')
@@ -47,8 +54,12 @@ def get_cosina_lens_list(scraping: IScrapingService) -> DataFrame:
         for h2_element in page.find_all('h2'):
             text = h2_element.text
             if '希望小売価格' in text:
-                temp['希望小売価格'] = text.replace('\n', '')
+                temp['希望小売価格'] = text
         temp_list.append(temp)
+    return temp_list
+
+
+def normalize_cosina_lens_list(temp_list: List[Dict[str, any]]) -> DataFrame:
     df = DataFrame.from_records(temp_list)
 
     # 変換用に整形
@@ -66,21 +77,21 @@ def get_cosina_lens_list(scraping: IScrapingService) -> DataFrame:
     del df['画角']
     del df['レンズ構成']
 
-    w, t = extract_numbers(df['name'], [], [r'F(\d+\.?\d*)'])
-    df['wide_f_number'] = [float(x) for x in w]
-    df['telephoto_f_number'] = [float(x) for x in t]
+    w, t = extract_number_arrays(df['name'], [], [r'F(\d+\.?\d*)'])
+    df['wide_f_number'] = check_number_array(w, df['name'], 'F値')
+    df['telephoto_f_number'] = check_number_array(t, df['name'], 'F値')
     del df['口径比']
     del df['最小絞り']
     del df['絞り羽根枚数']
 
-    w, t = extract_numbers(df['最短撮影距離'], [], [r'(\d+\.?\d+)m'])
-    df['wide_min_focus_distance'] = [int(Decimal(x).scaleb(3)) for x in w]
-    df['telephoto_min_focus_distance'] = [int(Decimal(x).scaleb(3)) for x in t]
+    distance, _ = parse_spec_values(df['最短撮影距離'], 'mm')
+    df['wide_min_focus_distance'] = to_int_array(distance, df['name'], '最短撮影距離')
+    df['telephoto_min_focus_distance'] = to_int_array(distance, df['name'], '最短撮影距離')
     del df['最短撮影距離']
 
     m: List[str] = []
     for record in df['最大撮影倍率']:
-        m.append(regex(record, r'1(:|：)(\d+\.?\d*)')[1])
+        m.append(regex(record, r'1:(\d+\.?\d*)')[0])
     df['max_photographing_magnification'] = [float(str((Decimal(1.0) / Decimal(x)).quantize(Decimal('0.01')))) for x in m]
     del df['最大撮影倍率']
 
@@ -99,18 +110,26 @@ def get_cosina_lens_list(scraping: IScrapingService) -> DataFrame:
     df['overall_length'] = le
     del df['最大径×全長']
 
-    weight, _ = extract_numbers(df['重量'], [], [r'(\d+)g'])
-    df['weight'] = weight
+    weight, valid = parse_spec_values(df['重量'], 'g')
+    df['weight'] = numpy.where(valid, weight, -1).astype(int)
     del df['重量']
 
-    price, _ = extract_numbers(df['希望小売価格'], [], [r'￥([\d,]+)'])
-    df['price'] = [int(x.replace(',', '')) for x in price]
+    price, _ = parse_spec_values(df['希望小売価格'], 'yen')
+    df['price'] = to_int_array(price, df['name'], '希望小売価格')
     del df['希望小売価格']
 
     df['mount'] = 'マイクロフォーサーズ'
     df['url'] = df['URL']
     del df['レンズフード']
-    del df['その他：']
+    del df['その他:']
     del df['URL']
 
     return df
+
+
+def get_cosina_lens_list(scraping: IScrapingService) -> DataFrame:
+    lens_list = discover_cosina_lens_list(scraping)
+    return normalize_cosina_lens_list(fetch_cosina_lens_list(scraping, lens_list))
+
+
+register_maker(MakerPlugin('COSINA', discover_cosina_lens_list, fetch_cosina_lens_list, normalize_cosina_lens_list))
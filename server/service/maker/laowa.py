@@ -1,13 +1,16 @@
 from decimal import Decimal
 from typing import List, Tuple, Dict
 
+import numpy
 from pandas import DataFrame
 
 from service.i_scraping_service import IScrapingService
-from service.ulitity import convert_columns, extract_numbers, regex
+from service.maker_registry import register_maker, MakerPlugin
+from service.ulitity import convert_columns, extract_numbers, extract_number_arrays, regex, parse_spec_values, \
+    check_number_array
 
 
-def get_laowa_lens_list(scraping: IScrapingService) -> DataFrame:
+def discover_laowa_lens_list(scraping: IScrapingService) -> List[Tuple[str, str]]:
     # レンズのURL一覧を取得する
     lens_list: List[Tuple[str, str]] = []
     page = scraping.get_page('https://www.laowa.jp/cat1/', cache=False)
@@ -23,10 +26,14 @@ def get_laowa_lens_list(scraping: IScrapingService) -> DataFrame:
         if 'LAOWA' in lens_name and 'mm' in lens_name:
             lens_list.append((lens_name, lens_url))
 
+    return lens_list
+
+
+def fetch_laowa_lens_list(scraping: IScrapingService, lens_list: List[Tuple[str, str]]) -> List[Dict[str, any]]:
     # レンズの情報を取得する
+    page_list = scraping.get_pages([x[1] for x in lens_list])
     lens_raw_data_list: List[Dict[str, any]] = []
-    for lens_name, lens_url in lens_list:
-        page = scraping.get_page(lens_url)
+    for (lens_name, lens_url), page in zip(lens_list, page_list):
         temp: Dict[str, str] = {'レンズ名': lens_name, 'URL': lens_url}
         section_element = page.find('div.productTable')
         if section_element is not None:
@@ -46,18 +53,22 @@ def get_laowa_lens_list(scraping: IScrapingService) -> DataFrame:
                     temp2['質量'] = temp['マウント']
                     temp = temp2
             lens_raw_data_list.append(temp)
+    return lens_raw_data_list
+
+
+def normalize_laowa_lens_list(lens_raw_data_list: List[Dict[str, any]]) -> DataFrame:
     df = DataFrame.from_records(lens_raw_data_list)
 
     # 変換用に整形
     df['maker'] = 'LAOWA'
     df = convert_columns(df, {
         'レンズ名': 'name', 'URL': 'url', 'フォーマット': '対応フォーマット', '対応マウント': 'マウント',
-        '寸法（鏡筒直径×長さ）': 'サイズ', '最小フォーカシングディスタンス': '最短撮影距離',
+        '寸法(鏡筒直径×長さ)': 'サイズ', '最小フォーカシングディスタンス': '最短撮影距離',
         '最大倍率比': '最大撮影倍率', '最大倍率': '最大撮影倍率',
         }, [
         '開放F値', '画角', 'レンズ構成', 'シフト機能', '最大イメージサークル', '絞り羽根枚数', 'フォーカス', 'JAN',
         '発売日', '絞り羽枚数', 'フォーカシング', 'フィルタースレッド', 'ワーキングディスタンス', '最大口径比',
-        '絞り羽根枚数（F）', '絞り羽根枚数（T）', 'シフト量', '最小ワーキングディスタンス', '対応フォーマット',
+        '絞り羽根枚数(F)', '絞り羽根枚数(T)', 'シフト量', '最小ワーキングディスタンス', '対応フォーマット',
     ])
     if '対応フォーマット' in df:
         del df['対応フォーマット']
@@ -92,24 +103,19 @@ def get_laowa_lens_list(scraping: IScrapingService) -> DataFrame:
     df['telephoto_focal_length'] = t_list2
     del df['焦点距離']
 
-    w, t = extract_numbers(df['name'], [r'F(\d+\.?\d*)-(\d+\.?\d*)'], [r'F(\d+\.?\d*)'])
-    df['wide_f_number'] = [float(x) for x in w]
-    df['telephoto_f_number'] = [float(x) for x in t]
+    w, t = extract_number_arrays(df['name'], [r'F(\d+\.?\d*)-(\d+\.?\d*)'], [r'F(\d+\.?\d*)'])
+    df['wide_f_number'] = check_number_array(w, df['name'], 'F値')
+    df['telephoto_f_number'] = check_number_array(t, df['name'], 'F値')
 
     w_fd_list: List[int] = []
     t_fd_list: List[int] = []
     for fd in df['最短撮影距離'].values:
-        result = regex(fd, r'(\d+.?\d*)mm～(\d+.?\d*)mm')
+        result = regex(fd, r'(\d+.?\d*)mm~(\d+.?\d*)mm')
         if len(result) > 0:
             w_fd_list.append(int(result[0]))
             t_fd_list.append(int(result[1]))
             continue
         result = regex(fd, r'(\d+.?\d*)cm')
-        if len(result) > 0:
-            w_fd_list.append(int(Decimal(result[0]) * 10))
-            t_fd_list.append(int(Decimal(result[0]) * 10))
-            continue
-        result = regex(fd, r'(\d+.?\d*)cｍ')
         if len(result) > 0:
             w_fd_list.append(int(Decimal(result[0]) * 10))
             t_fd_list.append(int(Decimal(result[0]) * 10))
@@ -179,20 +185,22 @@ def get_laowa_lens_list(scraping: IScrapingService) -> DataFrame:
         i.append(False)
     df['is_inner_zoom'] = i
 
-    d, le = extract_numbers(df['サイズ'], [r'(\d+\.?\d*)[^\d]+(\d+\.?\d*)(mm|ｍｍ)'], [])
-    df['overall_diameter'] = [float(x) for x in d]
-    df['overall_length'] = [float(x) for x in le]
+    d, le = extract_number_arrays(df['サイズ'], [r'(\d+\.?\d*)[^\d]+(\d+\.?\d*)mm'], [])
+    df['overall_diameter'] = check_number_array(d, df['name'], '最大径')
+    df['overall_length'] = check_number_array(le, df['name'], '全長')
     del df['サイズ']
 
-    weight: List[float] = []
-    for f in df['質量']:
-        result = regex(f, r'([\d,]+)(g|ｇ)')
-        if len(result) > 0:
-            weight.append(int(result[0].replace(',', '')))
-        else:
-            weight.append(-1)
-    df['weight'] = weight
+    weight, valid = parse_spec_values(df['質量'], 'g')
+    df['weight'] = numpy.where(valid, weight, -1).astype(int)
     del df['質量']
 
     df['price'] = 0
     return df
+
+
+def get_laowa_lens_list(scraping: IScrapingService) -> DataFrame:
+    lens_list = discover_laowa_lens_list(scraping)
+    return normalize_laowa_lens_list(fetch_laowa_lens_list(scraping, lens_list))
+
+
+register_maker(MakerPlugin('LAOWA', discover_laowa_lens_list, fetch_laowa_lens_list, normalize_laowa_lens_list))
@@ -4,10 +4,11 @@ from typing import List, Tuple, Dict
 from pandas import DataFrame, Series
 
 from service.i_scraping_service import IScrapingService
+from service.maker_registry import register_maker, MakerPlugin
 from service.ulitity import convert_columns, extract_numbers, regex
 
 
-def get_leica_lens_list(scraping: IScrapingService) -> DataFrame:
+def discover_leica_lens_list(scraping: IScrapingService) -> List[Tuple[str, str]]:
     # レンズのURL一覧を取得する
     lens_list: List[Tuple[str, str]] = []
     page_index = 0
@@ -30,10 +31,14 @@ def get_leica_lens_list(scraping: IScrapingService) -> DataFrame:
             lens_url = 'https://leica-camera.com' + article_element.find('a.node-link').attrs['href']
             lens_list.append((lens_name, lens_url))
 
+    return lens_list
+
+
+def fetch_leica_lens_list(scraping: IScrapingService, lens_list: List[Tuple[str, str]]) -> List[Dict[str, any]]:
     # レンズの生情報を取得する
+    page_list = scraping.get_pages([x[1] for x in lens_list])
     lens_raw_data_list: List[Dict[str, any]] = []
-    for lens_name, lens_url in lens_list:
-        page = scraping.get_page(lens_url)
+    for (lens_name, lens_url), page in zip(lens_list, page_list):
         temp: Dict[str, str] = {'レンズ名': lens_name, 'URL': lens_url}
         for tr_element in page.find_all('tr'):
             th_elements = tr_element.find_all('th')
@@ -45,6 +50,10 @@ def get_leica_lens_list(scraping: IScrapingService) -> DataFrame:
             else:
                 continue
         lens_raw_data_list.append(temp)
+    return lens_raw_data_list
+
+
+def normalize_leica_lens_list(lens_raw_data_list: List[Dict[str, any]]) -> DataFrame:
     df = DataFrame.from_records(lens_raw_data_list)
 
     # 変換用に整形
@@ -174,17 +183,17 @@ def get_leica_lens_list(scraping: IScrapingService) -> DataFrame:
     for record in df.iterrows():
         record = record[1]
         if '/' in record['Largest diameter']:
-            diameter = regex(record['Largest diameter'].replace('\u2009', ' '), r'(\d+\.?\d*)/\d+ mm')
+            diameter = regex(record['Largest diameter'], r'(\d+\.?\d*)/\d+ mm')
         elif ':' in record['Largest diameter']:
-            diameter = regex(record['Largest diameter'].replace('\u2009', ' '), r': (\d+\.?\d*) mm')
+            diameter = regex(record['Largest diameter'], r': (\d+\.?\d*) mm')
         else:
-            diameter = regex(record['Largest diameter'].replace('\u2009', ' '), r'(\d+\.?\d*) mm')
+            diameter = regex(record['Largest diameter'], r'(\d+\.?\d*) mm')
         if '/' in record['Length to bayonet mount']:
-            length = regex(record['Length to bayonet mount'].replace('\u2009', ' '), r'(\d+\.?\d*)/\d+ mm')
+            length = regex(record['Length to bayonet mount'], r'(\d+\.?\d*)/\d+ mm')
         elif ':' in record['Length to bayonet mount']:
-            length = regex(record['Length to bayonet mount'].replace('\u2009', ' '), r': (\d+\.?\d*) mm')
+            length = regex(record['Length to bayonet mount'], r': (\d+\.?\d*) mm')
         else:
-            length = regex(record['Length to bayonet mount'].replace('\u2009', ' '), r'(\d+\.?\d*) mm')
+            length = regex(record['Length to bayonet mount'], r'(\d+\.?\d*) mm')
         overall_diameter.append(float(diameter[0]))
         overall_length.append(float(length[0]))
     df['overall_diameter'] = overall_diameter
@@ -195,7 +204,7 @@ def get_leica_lens_list(scraping: IScrapingService) -> DataFrame:
     # weight
     weight: List[float] = []
     for i in range(0, len(df)):
-        f = df['Weight'].values[i].replace('\u2009', ' ')
+        f = df['Weight'].values[i]
         result = regex(f, r'([\d.]+) g')
         if len(result) > 0:
             result2 = regex(f, r'([\d.]+)/[\d.]+ g')
@@ -210,3 +219,11 @@ def get_leica_lens_list(scraping: IScrapingService) -> DataFrame:
 
     df['price'] = 0
     return df
+
+
+def get_leica_lens_list(scraping: IScrapingService) -> DataFrame:
+    lens_list = discover_leica_lens_list(scraping)
+    return normalize_leica_lens_list(fetch_leica_lens_list(scraping, lens_list))
+
+
+register_maker(MakerPlugin('LEICA', discover_leica_lens_list, fetch_leica_lens_list, normalize_leica_lens_list))
@@ -1,21 +1,35 @@
-import warnings
 from decimal import Decimal
 from typing import List, Tuple, Dict
 
+import numpy
 from pandas import DataFrame
-from pandas.core.common import SettingWithCopyWarning
 
 from model.DomObject import DomObject
 from service.i_scraping_service import IScrapingService
-from service.ulitity import extract_numbers, regex
+from service.maker_registry import register_maker, MakerPlugin
+from service.ulitity import extract_numbers, extract_number_arrays, regex, parse_spec_values, to_int_array, \
+    check_number_array
 
 
-def get_olympus_lens_list(scraping: IScrapingService) -> DataFrame:
+def get_spec_url(lens_product_number: str) -> str:
+    """詳細ページのURLを返す"""
+    if lens_product_number != '14-42_35-56':
+        return f'https://www.olympus-imaging.jp/product/dslr/mlens/{lens_product_number}/spec.html'
+    else:
+        return f'https://www.olympus-imaging.jp/product/dslr/mlens/{lens_product_number}/spec/index.html'
+
+
+def get_index_url(lens_product_number: str) -> str:
+    """製品トップページのURLを返す"""
+    return f'https://www.olympus-imaging.jp/product/dslr/mlens/{lens_product_number}/index.html'
+
+
+def discover_olympus_lens_list(scraping: IScrapingService) -> List[Tuple[str, str]]:
     # レンズのURL一覧を取得する
     page = scraping.get_page('https://www.olympus-imaging.jp/product/dslr/mlens/index.html', cache=False)
     lens_list: List[Tuple[str, str]] = []
     for a_element in page.find_all('h2.productName > a'):
-        lens_name = a_element.text.split('/')[0].replace('\n', '')
+        lens_name = a_element.text.split('/')[0].strip()
         if 'M.ZUIKO' not in lens_name:
             continue
         lens_product_number = a_element.attrs['href'].replace('/product/dslr/mlens/', '').replace('/index.html', '')
@@ -33,15 +47,22 @@ def get_olympus_lens_list(scraping: IScrapingService) -> DataFrame:
         lens_product_number = a_element2.attrs['href'].replace('/product/dslr/mlens/', '').replace('/index.html', '')
         lens_list.append((lens_name, lens_product_number))
 
+    return lens_list
+
+
+def fetch_olympus_lens_list(scraping: IScrapingService, lens_list: List[Tuple[str, str]]) -> List[Dict[str, str]]:
+    # 詳細ページと製品トップページをまとめて取得する
+    url_list: List[str] = []
+    for _, lens_product_number in lens_list:
+        url_list.append(get_spec_url(lens_product_number))
+        url_list.append(get_index_url(lens_product_number))
+    page_dict: Dict[str, DomObject] = dict(scraping.iter_pages(url_list))
+
     # レンズごとに情報を取得する
     lens_data_list: List[Dict[str, str]] = []
     for lens_name, lens_product_number in lens_list:
         # 詳細ページから情報を取得する
-        if lens_product_number != '14-42_35-56':
-            spec_url = f'https://www.olympus-imaging.jp/product/dslr/mlens/{lens_product_number}/spec.html'
-        else:
-            spec_url = f'https://www.olympus-imaging.jp/product/dslr/mlens/{lens_product_number}/spec/index.html'
-        page = scraping.get_page(spec_url)
+        page = page_dict[get_spec_url(lens_product_number)]
         temp_dict: Dict[str, str] = {}
         for tr_element in page.find('table').find_all('tr'):
             tr_element: DomObject = tr_element
@@ -60,8 +81,8 @@ def get_olympus_lens_list(scraping: IScrapingService) -> DataFrame:
             temp_dict[th_element.text] = td_element.text
 
         # 製品トップページから情報を取得する
-        index_url = f'https://www.olympus-imaging.jp/product/dslr/mlens/{lens_product_number}/index.html'
-        page = scraping.get_page(index_url)
+        index_url = get_index_url(lens_product_number)
+        page = page_dict[index_url]
         temp_dict['URL'] = index_url
         table_element = page.find('table')
         # 詳細ページとはth・tdの拾い方を変えているのは、
@@ -76,7 +97,7 @@ def get_olympus_lens_list(scraping: IScrapingService) -> DataFrame:
             temp_dict[th_element2.text] = td_element.text
 
         # 必要な列を追加
-        temp_dict['name'] = lens_name.replace('　', ' ')
+        temp_dict['name'] = lens_name
         temp_dict['product_number'] = lens_product_number
 
         # 不要な列を削除
@@ -101,9 +122,9 @@ def get_olympus_lens_list(scraping: IScrapingService) -> DataFrame:
             'フード',
             '最大口径比',
             '最小口径比',
-            '最大口径比／最小口径比',
+            '最大口径比/最小口径比',
             '35mm判換算最大撮影倍率',
-            '最大撮影倍率（35mm判換算）',
+            '最大撮影倍率(35mm判換算)',
             '手ぶれ補正性能',
             'ズーム',
             'ズーム方式',
@@ -115,24 +136,21 @@ def get_olympus_lens_list(scraping: IScrapingService) -> DataFrame:
                 del temp_dict[column]
 
         # 一部列だけ列名を変更しないと結合できないので対処
-        if '大きさ　最大径×長さ' in temp_dict:
-            temp_dict['大きさ 最大径×全長'] = temp_dict['大きさ　最大径×長さ']
-            del temp_dict['大きさ　最大径×長さ']
-        if '大きさ　最大径 × 全長' in temp_dict:
-            temp_dict['大きさ 最大径×全長'] = temp_dict['大きさ　最大径 × 全長']
-            del temp_dict['大きさ　最大径 × 全長']
-        if '大きさ　最大径×全長' in temp_dict:
-            temp_dict['大きさ 最大径×全長'] = temp_dict['大きさ　最大径×全長']
-            del temp_dict['大きさ　最大径×全長']
+        if '大きさ 最大径×長さ' in temp_dict:
+            temp_dict['大きさ 最大径×全長'] = temp_dict['大きさ 最大径×長さ']
+            del temp_dict['大きさ 最大径×長さ']
+        if '大きさ 最大径 × 全長' in temp_dict:
+            temp_dict['大きさ 最大径×全長'] = temp_dict['大きさ 最大径 × 全長']
+            del temp_dict['大きさ 最大径 × 全長']
         if '大きさ 最大径 x 全長' in temp_dict:
             temp_dict['大きさ 最大径×全長'] = temp_dict['大きさ 最大径 x 全長']
             del temp_dict['大きさ 最大径 x 全長']
         if '防滴性能 / 防塵機構' in temp_dict:
             temp_dict['防滴処理'] = temp_dict['防滴性能 / 防塵機構']
             del temp_dict['防滴性能 / 防塵機構']
-        if '防滴性能／防塵機構' in temp_dict:
-            temp_dict['防滴処理'] = temp_dict['防滴性能／防塵機構']
-            del temp_dict['防滴性能／防塵機構']
+        if '防滴性能/防塵機構' in temp_dict:
+            temp_dict['防滴処理'] = temp_dict['防滴性能/防塵機構']
+            del temp_dict['防滴性能/防塵機構']
         if '防滴性能 / 防塵機構搭載' in temp_dict:
             temp_dict['防滴処理'] = temp_dict['防滴性能 / 防塵機構搭載']
             del temp_dict['防滴性能 / 防塵機構搭載']
@@ -141,31 +159,32 @@ def get_olympus_lens_list(scraping: IScrapingService) -> DataFrame:
             del temp_dict['価格']
         lens_data_list.append(temp_dict)
 
+    return lens_data_list
+
+
+def normalize_olympus_lens_list(lens_data_list: List[Dict[str, str]]) -> DataFrame:
     df = DataFrame.from_records(lens_data_list)
 
     # 変換用に整形
     df['maker'] = 'OLYMPUS'
 
     # focal_length
-    w, t = extract_numbers(df['焦点距離'], [r'(\d+)-(\d+)mm', r'(\d+) - (\d+)mm'], [r'(\d+)mm'])
-    df['wide_focal_length'] = [int(x) * 2 for x in w]
-    df['telephoto_focal_length'] = [int(x) * 2 for x in t]
-    # M.ZUIKO DIGITAL　ED 150-400mm F4.5 TC1.25x IS PROは内蔵テレコンを持つので、その対策
-    with warnings.catch_warnings():
-        warnings.simplefilter('ignore', SettingWithCopyWarning)
-        df.telephoto_focal_length[df.product_number == '150-400_45ispro'] = 1000
+    w, t = extract_number_arrays(df['焦点距離'], [r'(\d+)-(\d+)mm', r'(\d+) - (\d+)mm'], [r'(\d+)mm'])
+    df['wide_focal_length'] = to_int_array(w * 2, df['name'], '焦点距離')
+    df['telephoto_focal_length'] = to_int_array(t * 2, df['name'], '焦点距離')
+    # M.ZUIKO DIGITAL ED 150-400mm F4.5 TC1.25x IS PROは内蔵テレコンを持つので、その対策
+    df.loc[df['product_number'] == '150-400_45ispro', 'telephoto_focal_length'] = 1000
     del df['焦点距離']
 
     # f_number
-    w, t = extract_numbers(df['name'], [r'F(\d+\.?\d*)-(\d+\.?\d*)'], [r'F(\d+\.?\d*)'])
-    df['wide_f_number'] = [float(x) for x in w]
-    df['telephoto_f_number'] = [float(x) for x in t]
+    w, t = extract_number_arrays(df['name'], [r'F(\d+\.?\d*)-(\d+\.?\d*)'], [r'F(\d+\.?\d*)'])
+    df['wide_f_number'] = check_number_array(w, df['name'], 'F値')
+    df['telephoto_f_number'] = check_number_array(t, df['name'], 'F値')
 
     # min_focus_distance
     w, t = extract_numbers(df['最短撮影距離'],
-                           [r'(\d+\.?\d+)m（.+） / (\d+\.?\d+)m（.+）',
-                            r'(\d+\.?\d+)m \(.+\) / (\d+\.?\d+)m \(.+\)',
-                            r'(\d+\.?\d+)m.+／(\d+\.?\d+)m.+'],
+                           [r'(\d+\.?\d+)m ?\(.+\) / (\d+\.?\d+)m ?\(.+\)',
+                            r'(\d+\.?\d+)m.+/(\d+\.?\d+)m.+'],
                            [r'(\d+\.?\d+)m', r'(\d+\.?\d+) m'])
     df['wide_min_focus_distance'] = [int(Decimal(x).scaleb(3)) for x in w]
     df['telephoto_min_focus_distance'] = [int(Decimal(x).scaleb(3)) for x in t]
@@ -173,17 +192,11 @@ def get_olympus_lens_list(scraping: IScrapingService) -> DataFrame:
 
     # max_photographing_magnification
     w, t = extract_numbers(df['最大撮影倍率'],
-                           [r'(\d+\.?\d+)倍 \(Wide\) ／ (\d+\.?\d+)倍 \(Tele\)',
-                            r'Wide：(\d+\.?\d+)倍／Tele:(\d+\.?\d+)倍',
-                            r'(\d+\.?\d+)倍（Wide） / (\d+\.?\d+)倍（Tele）',
-                            r'Wide：(\d+\.?\d+)倍／Tele：(\d+\.?\d+)倍',
-                            r'(\d+\.?\d+)倍（Wide）/ (\d+\.?\d+)倍（Tele）'],
-                           [r'(\d+\.?\d+)倍（35mm判換算\d+\.?\d+倍相当）',
-                            r'(\d+\.?\d+)倍（35mm判換算 \d+\.?\d+倍相当）',
-                            r'(\d+\.?\d+)倍（Wide / Tele）',
-                            r'(\d+\.?\d+)倍 \(35mm判換算 \d+\.?\d+倍相当\)',
-                            r'(\d+\.?\d+)倍（35mm判換算 \d+\.?\d+倍）',
-                            r'(\d+\.?\d+)倍（マクロモード時）（35mm判換算 \d+\.?\d+倍）'])
+                           [r'(\d+\.?\d+)倍 ?\(Wide\) ?/ (\d+\.?\d+)倍 ?\(Tele\)',
+                            r'Wide:(\d+\.?\d+)倍/Tele:(\d+\.?\d+)倍'],
+                           [r'(\d+\.?\d+)倍 ?\(35mm判換算 ?\d+\.?\d+倍(?:相当)?\)',
+                            r'(\d+\.?\d+)倍\(Wide / Tele\)',
+                            r'(\d+\.?\d+)倍\(マクロモード時\)\(35mm判換算 \d+\.?\d+倍\)'])
     m: List[float] = []
     for a, b, text in zip(w, t, df['最大撮影倍率'].values):
         if a == b:
@@ -234,7 +247,7 @@ def get_olympus_lens_list(scraping: IScrapingService) -> DataFrame:
     d, le = extract_numbers(df['大きさ 最大径×全長'], [
         r'φ(\d+.?\d*)x(\d+.?\d*)mm',
         r'Ø(\d+.?\d*)×(\d+.?\d*)mm',
-        r'Φ (\d+.?\d*) mm  ｘ (\d+.?\d*) mm',
+        r'Φ (\d+.?\d*) mm x (\d+.?\d*) mm',
         r'⌀(\d+.?\d*) x (\d+.?\d*)mm',
         r'Ø(\d+.?\d*) × (\d+.?\d*)mm',
         r'Ø(\d+.?\d*) x (\d+.?\d*)mm',
@@ -249,25 +262,13 @@ def get_olympus_lens_list(scraping: IScrapingService) -> DataFrame:
     del df['大きさ 最大径×全長']
 
     # weight
-    weight: List[float] = []
-    for f in df['質量']:
-        result = regex(f, r'([\d,]+)[^\d]*(g|ｇ)')
-        if len(result) > 0:
-            weight.append(int(result[0].replace(',', '')))
-        else:
-            weight.append(-1)
-    df['weight'] = weight
+    weight, valid = parse_spec_values(df['質量'], 'g')
+    df['weight'] = numpy.where(valid, weight, -1).astype(int)
     del df['質量']
 
     # price
-    price: List[float] = []
-    for f in df['希望小売価格']:
-        result = regex(f, r'([\d,]+)円')
-        if len(result) > 0:
-            price.append(int(result[0].replace(',', '')))
-        else:
-            price.append(-1)
-    df['price'] = price
+    price, valid = parse_spec_values(df['希望小売価格'], 'yen')
+    df['price'] = numpy.where(valid, price, -1).astype(int)
     del df['希望小売価格']
 
     # mount・url
@@ -275,3 +276,11 @@ def get_olympus_lens_list(scraping: IScrapingService) -> DataFrame:
     df['url'] = df['URL']
     del df['URL']
     return df
+
+
+def get_olympus_lens_list(scraping: IScrapingService) -> DataFrame:
+    lens_list = discover_olympus_lens_list(scraping)
+    return normalize_olympus_lens_list(fetch_olympus_lens_list(scraping, lens_list))
+
+
+register_maker(MakerPlugin('OLYMPUS', discover_olympus_lens_list, fetch_olympus_lens_list, normalize_olympus_lens_list))
@@ -0,0 +1,31 @@
+import pandas
+from pandas import DataFrame
+
+from service.i_scraping_service import IScrapingService
+from service.maker_registry import register_maker, MakerPlugin
+
+# その他(DZOFilm・KAMLAN・KOWA・TAMRON・Tokina・銘匠光学・Vazen・安原製作所・ヨンヌオ・中一光学・七工匠)
+# 銘匠光学はTTArtisan、ヨンヌオはYONGNUO、中一光学はZhongyi Optics Electronics、七工匠は7artisansとする
+LENS_CSV_PATH = 'csv/lenses.csv'
+
+
+def discover_other_lens_list(_: IScrapingService) -> str:
+    return LENS_CSV_PATH
+
+
+def fetch_other_lens_list(_: IScrapingService, csv_path: str) -> DataFrame:
+    return pandas.read_csv(csv_path, dtype={'product_number': str})
+
+
+def normalize_other_lens_list(df: DataFrame) -> DataFrame:
+    # 手入力したデータなので、整形済みのものをそのまま使う
+    return df
+
+
+def get_other_lens_list(scraping: IScrapingService) -> DataFrame:
+    csv_path = discover_other_lens_list(scraping)
+    return normalize_other_lens_list(fetch_other_lens_list(scraping, csv_path))
+
+
+register_maker(MakerPlugin('Other', discover_other_lens_list, fetch_other_lens_list, normalize_other_lens_list,
+                           [LENS_CSV_PATH]))
@@ -1,19 +1,17 @@
 from decimal import Decimal
-from typing import List, Dict, Set
+from typing import List, Dict, Set, Tuple, Any
 
+import numpy
 import pandas
 from pandas import DataFrame
 
 from service.i_scraping_service import IScrapingService
-from service.ulitity import regex, extract_numbers, convert_columns
+from service.maker_registry import register_maker, MakerPlugin
+from service.ulitity import regex, extract_numbers, extract_number_arrays, convert_columns, parse_spec_values, \
+    to_int_array, check_number_array
 
 
-def cleansing(s: str):
-    """文字列を正規化する"""
-    return s.strip()
-
-
-def get_panasonic_lens_list(scraping: IScrapingService) -> DataFrame:
+def discover_panasonic_lens_list(scraping: IScrapingService) -> Tuple[DataFrame, DataFrame]:
     # 情報ページを開く
     page = scraping.get_page('https://panasonic.jp/dc/comparison.html', cache=False)
 
@@ -22,11 +20,11 @@ def get_panasonic_lens_list(scraping: IScrapingService) -> DataFrame:
     for table_element in page.find_all('table'):
         if 'LUMIX G' not in table_element.full_text:
             continue
-        df1['レンズ名'] = [cleansing(x.text) for x in table_element.find_all('th p')]
+        df1['レンズ名'] = [x.text for x in table_element.find_all('th p')]
         df1['URL'] = ['https://panasonic.jp' + x.attrs['href'] for x in table_element.find_all('th a')]
         for tr_element in table_element.find_all('tbody > tr'):
-            key = cleansing(tr_element.find('th').text)
-            value = [cleansing(x.text) for x in tr_element.find_all('td')]
+            key = tr_element.find('th').text
+            value = [x.text for x in tr_element.find_all('td')]
             df1[key] = value
         break
 
@@ -34,20 +32,23 @@ def get_panasonic_lens_list(scraping: IScrapingService) -> DataFrame:
     for table_element in page.find_all('table'):
         if 'LUMIX S' not in table_element.full_text:
             continue
-        df2['レンズ名'] = [cleansing(x.text) for x in table_element.find_all('th p')]
+        df2['レンズ名'] = [x.text for x in table_element.find_all('th p')]
         df2['URL'] = ['https://panasonic.jp' + x.attrs['href'] for x in table_element.find_all('th a')]
         for tr_element in table_element.find_all('tbody > tr'):
             if tr_element.find('th') is None:
                 continue
-            key = cleansing(tr_element.find('th').text)
-            value = [cleansing(x.text) for x in tr_element.find_all('td')]
+            key = tr_element.find('th').text
+            value = [x.text for x in tr_element.find_all('td')]
             df2[key] = value
         # なぜか、「最大径×全長」だけ記述位置が異なるので対策
-        key = cleansing(table_element.find('tbody > th').text)
-        value = [cleansing(x.text) for x in table_element.find_all('tbody > td')]
+        key = table_element.find('tbody > th').text
+        value = [x.text for x in table_element.find_all('tbody > td')]
         df2[key] = value
         break
+    return df1, df2
+
 
+def normalize_panasonic_lens_list(df1: DataFrame, df2: DataFrame) -> DataFrame:
     # データを加工し、結合できるように整える
     df1 = convert_columns(df1, {
         'レンズ名': 'name',
@@ -95,26 +96,26 @@ def get_panasonic_lens_list(scraping: IScrapingService) -> DataFrame:
     df2['mount'] = 'ライカL'
 
     # 結合
-    df = pandas.concat([df1, df2])
+    df = pandas.concat([df1, df2], ignore_index=True)
 
     # 変換用に整形
     df['maker'] = 'Panasonic'
 
     # focal_length
-    w, t = extract_numbers(df['focal_length'], [r'(\d+)mm～(\d+)mm', r'(\d+)-(\d+)mm'], [r'(\d+)mm'])
-    df['wide_focal_length'] = [int(x) for x in w]
-    df['telephoto_focal_length'] = [int(x) for x in t]
+    w, t = extract_number_arrays(df['focal_length'], [r'(\d+)mm~(\d+)mm', r'(\d+)-(\d+)mm'], [r'(\d+)mm'])
+    df['wide_focal_length'] = to_int_array(w, df['name'], '焦点距離')
+    df['telephoto_focal_length'] = to_int_array(t, df['name'], '焦点距離')
     del df['focal_length']
 
     # f_number
-    w, t = extract_numbers(df['name'], [r'F(\d+\.?\d*)-(\d+\.?\d*)'], [r'F(\d+\.?\d*)'])
-    df['wide_f_number'] = [float(x) for x in w]
-    df['telephoto_f_number'] = [float(x) for x in t]
+    w, t = extract_number_arrays(df['name'], [r'F(\d+\.?\d*)-(\d+\.?\d*)'], [r'F(\d+\.?\d*)'])
+    df['wide_f_number'] = check_number_array(w, df['name'], 'F値')
+    df['telephoto_f_number'] = check_number_array(t, df['name'], 'F値')
 
     # min_focus_distance
     w, t = extract_numbers(df['min_focus_distance'],
-                           [r'(\d+\.?\d+)m / (\d+\.?\d+)m', r'(\d+\.?\d+)m～∞.*(\d+\.?\d+)m～∞'],
-                           [r'(\d+\.?\d+)m', r'(\d+\.?\d+)m～∞'])
+                           [r'(\d+\.?\d+)m / (\d+\.?\d+)m', r'(\d+\.?\d+)m~∞.*(\d+\.?\d+)m~∞'],
+                           [r'(\d+\.?\d+)m', r'(\d+\.?\d+)m~∞'])
     df['wide_min_focus_distance'] = [int(Decimal(x).scaleb(3)) for x in w]
     df['telephoto_min_focus_distance'] = [int(Decimal(x).scaleb(3)) for x in t]
     del df['min_focus_distance']
@@ -143,7 +144,7 @@ def get_panasonic_lens_list(scraping: IScrapingService) -> DataFrame:
     df['is_drip_proof'] = df['is_drip_proof'].map(lambda x: x == '○')
 
     # has_image_stabilization
-    df['has_image_stabilization'] = df['has_image_stabilization'].map(lambda x: x != '－')
+    df['has_image_stabilization'] = df['has_image_stabilization'].map(lambda x: x != '-')
 
     # is_inner_zoom
     i: List[bool] = []
@@ -158,34 +159,27 @@ def get_panasonic_lens_list(scraping: IScrapingService) -> DataFrame:
     df['is_inner_zoom'] = i
 
     # overall_diameter, overall_length
-    d, le = extract_numbers(df['overall_size'], [r'(\d+\.?\d*)mm[^\d]*(\d+\.?\d*)mm'], [])
-    df['overall_diameter'] = [float(x) for x in d]
-    df['overall_length'] = [float(x) for x in le]
+    d, le = extract_number_arrays(df['overall_size'], [r'(\d+\.?\d*)mm[^\d]*(\d+\.?\d*)mm'], [])
+    df['overall_diameter'] = check_number_array(d, df['name'], '最大径')
+    df['overall_length'] = check_number_array(le, df['name'], '全長')
     del df['overall_size']
 
     # weight
-    weight: List[float] = []
-    for f in df['weight']:
-        result = regex(f, r'([\d,]+)g')
-        if len(result) > 0:
-            weight.append(int(result[0].replace(',', '')))
-        else:
-            weight.append(-1)
-    df['weight'] = weight
+    weight, valid = parse_spec_values(df['weight'], 'g')
+    df['weight'] = numpy.where(valid, weight, -1).astype(int)
 
     # price
-    price: List[float] = []
-    for f in df['price']:
-        result = regex(f, r'([\d,]+) *円')
-        if len(result) > 0:
-            price.append(int(result[0].replace(',', '')))
-        else:
-            price.append(-1)
-    df['price'] = price
+    price, valid = parse_spec_values(df['price'], 'yen')
+    df['price'] = numpy.where(valid, price, -1).astype(int)
     return df
 
 
-def get_panasonic_old_lens_list(scraping: IScrapingService) -> DataFrame:
+def get_panasonic_lens_list(scraping: IScrapingService) -> DataFrame:
+    df1, df2 = discover_panasonic_lens_list(scraping)
+    return normalize_panasonic_lens_list(df1, df2)
+
+
+def discover_panasonic_old_lens_list(scraping: IScrapingService) -> List[str]:
     # 情報ページを開く
     page = scraping.get_page('https://panasonic.jp/dc/products/g_series_lens.html', cache=False)
 
@@ -195,11 +189,15 @@ def get_panasonic_old_lens_list(scraping: IScrapingService) -> DataFrame:
         link_url = a_element.attrs['href']
         if len(regex(link_url, r'(http://panasonic\.jp/dc/p-db/.+\.html)')) > 0:
             link_url_set.add(link_url)
+    # 実行ごとに順番が変わらないよう並べ替えておく
+    return sorted(link_url_set)
 
-    # 順番に取得する
+
+def fetch_panasonic_old_lens_list(scraping: IScrapingService, link_url_list: List[str]) -> List[Dict[str, any]]:
+    # まとめて取得してから順番に処理する
+    page_list = scraping.get_pages([x.replace('.html', '_spec.html') for x in link_url_list])
     temp_list: List[Dict[str, any]] = []
-    for link_url in link_url_set:
-        page = scraping.get_page(link_url.replace('.html', '_spec.html'))
+    for link_url, page in zip(link_url_list, page_list):
         table_element = page.find('table')
         temp_dict: Dict[str, any] = {}
         temp_dict['リンク'] = link_url
@@ -207,6 +205,10 @@ def get_panasonic_old_lens_list(scraping: IScrapingService) -> DataFrame:
         for th_element, td_element in zip(table_element.find_all('th'), table_element.find_all('td')):
             temp_dict[th_element.text] = td_element.text
         temp_list.append(temp_dict)
+    return temp_list
+
+
+def normalize_panasonic_old_lens_list(temp_list: List[Dict[str, any]]) -> DataFrame:
     df = DataFrame.from_records(temp_list)
 
     # 変換用に整形
@@ -218,21 +220,21 @@ def get_panasonic_old_lens_list(scraping: IScrapingService) -> DataFrame:
     df['product_number'] = df['型番']
     del df['型番']
 
-    w, t = extract_numbers(df['焦点距離'], [r'(\d+)mm～(\d+)mm', r'(\d+)-(\d+)mm'], [r'(\d+)mm'])
-    df['wide_focal_length'] = [int(x) * 2 for x in w]
-    df['telephoto_focal_length'] = [int(x) * 2 for x in t]
+    w, t = extract_number_arrays(df['焦点距離'], [r'(\d+)mm~(\d+)mm', r'(\d+)-(\d+)mm'], [r'(\d+)mm'])
+    df['wide_focal_length'] = to_int_array(w * 2, df['name'], '焦点距離')
+    df['telephoto_focal_length'] = to_int_array(t * 2, df['name'], '焦点距離')
     del df['焦点距離']
 
-    w, t = extract_numbers(df['name'], [r'F(\d+\.?\d*)-(\d+\.?\d*)'], [r'F(\d+\.?\d*)'])
-    df['wide_f_number'] = [float(x) for x in w]
-    df['telephoto_f_number'] = [float(x) for x in t]
+    w, t = extract_number_arrays(df['name'], [r'F(\d+\.?\d*)-(\d+\.?\d*)'], [r'F(\d+\.?\d*)'])
+    df['wide_f_number'] = check_number_array(w, df['name'], 'F値')
+    df['telephoto_f_number'] = check_number_array(t, df['name'], 'F値')
     del df['開放絞り']
     del df['絞り形式']
     del df['最小絞り']
 
     w, t = extract_numbers(df['最短撮影距離'],
-                           [r'(\d+\.?\d+)m / (\d+\.?\d+)m', r'(\d+\.?\d+)m～∞.*(\d+\.?\d+)m～∞'],
-                           [r'(\d+\.?\d+)m', r'(\d+\.?\d+)m～∞'])
+                           [r'(\d+\.?\d+)m / (\d+\.?\d+)m', r'(\d+\.?\d+)m~∞.*(\d+\.?\d+)m~∞'],
+                           [r'(\d+\.?\d+)m', r'(\d+\.?\d+)m~∞'])
     df['wide_min_focus_distance'] = [int(Decimal(x).scaleb(3)) for x in w]
     df['telephoto_min_focus_distance'] = [int(Decimal(x).scaleb(3)) for x in t]
     del df['最短撮影距離']
@@ -264,19 +266,13 @@ def get_panasonic_old_lens_list(scraping: IScrapingService) -> DataFrame:
         i.append(False)
     df['is_inner_zoom'] = i
 
-    d, le = extract_numbers(df['外形寸法'], [r'(\d+\.?\d*)mm[^\d]*(\d+\.?\d*)mm'], [])
-    df['overall_diameter'] = [float(x) for x in d]
-    df['overall_length'] = [float(x) for x in le]
+    d, le = extract_number_arrays(df['外形寸法'], [r'(\d+\.?\d*)mm[^\d]*(\d+\.?\d*)mm'], [])
+    df['overall_diameter'] = check_number_array(d, df['name'], '最大径')
+    df['overall_length'] = check_number_array(le, df['name'], '全長')
     del df['外形寸法']
 
-    weight: List[float] = []
-    for f in df['質量']:
-        result = regex(f, r'([\d,]+)g')
-        if len(result) > 0:
-            weight.append(int(result[0].replace(',', '')))
-        else:
-            weight.append(-1)
-    df['weight'] = weight
+    weight, valid = parse_spec_values(df['質量'], 'g')
+    df['weight'] = numpy.where(valid, weight, -1).astype(int)
     del df['質量']
 
     df['price'] = 0  # なぜか記載がなかったので
@@ -288,3 +284,29 @@ def get_panasonic_old_lens_list(scraping: IScrapingService) -> DataFrame:
     del df['リンク']
 
     return df
+
+
+def get_panasonic_old_lens_list(scraping: IScrapingService) -> DataFrame:
+    link_url_list = discover_panasonic_old_lens_list(scraping)
+    return normalize_panasonic_old_lens_list(fetch_panasonic_old_lens_list(scraping, link_url_list))
+
+
+# 現行品の比較表(マイクロフォーサーズ・ライカL)と、旧製品の情報をまとめて扱う
+PanasonicLensList = Tuple[Tuple[DataFrame, DataFrame], List[Any]]
+
+
+def discover_panasonic(scraping: IScrapingService) -> PanasonicLensList:
+    return discover_panasonic_lens_list(scraping), discover_panasonic_old_lens_list(scraping)
+
+
+def fetch_panasonic(scraping: IScrapingService, lens_list: PanasonicLensList) -> PanasonicLensList:
+    table_data, link_url_list = lens_list
+    return table_data, fetch_panasonic_old_lens_list(scraping, link_url_list)
+
+
+def normalize_panasonic(lens_list: PanasonicLensList) -> DataFrame:
+    (df1, df2), temp_list = lens_list
+    return pandas.concat([normalize_panasonic_lens_list(df1, df2), normalize_panasonic_old_lens_list(temp_list)])
+
+
+register_maker(MakerPlugin('Panasonic', discover_panasonic, fetch_panasonic, normalize_panasonic))
@@ -6,10 +6,11 @@ from typing import List, Tuple, Dict
 from pandas import DataFrame
 
 from service.i_scraping_service import IScrapingService
-from service.ulitity import extract_numbers, regex
+from service.maker_registry import register_maker, MakerPlugin
+from service.ulitity import extract_numbers, extract_number_arrays, regex, check_number_array
 
 
-def get_samyang_lens_list(scraping: IScrapingService) -> DataFrame:
+def discover_samyang_lens_list(scraping: IScrapingService) -> List[Tuple[str, str, str]]:
     # レンズのURL一覧を取得する
     lens_list: List[Tuple[str, str, str]] = []
     page = scraping.get_page('https://www.kenko-tokina.co.jp/camera-lens/samyang/', cache=False)
@@ -21,10 +22,14 @@ def get_samyang_lens_list(scraping: IScrapingService) -> DataFrame:
             if 'マイクロフォーサーズ' in mount_info:
                 lens_list.append((lens_name, lens_url, 'マイクロフォーサーズ'))
 
+    return lens_list
+
+
+def fetch_samyang_lens_list(scraping: IScrapingService, lens_list: List[Tuple[str, str, str]]) -> List[Dict[str, any]]:
     # レンズの情報を取得する
+    page_list = scraping.get_pages([x[1] for x in lens_list])
     temp_list: List[Dict[str, any]] = []
-    for lens_name, lens_url, lens_mount in lens_list:
-        page = scraping.get_page(lens_url)
+    for (lens_name, lens_url, lens_mount), page in zip(lens_list, page_list):
         for table_element in page.find_all('table'):
             temp: Dict[str, any] = {
                 'name': lens_name,
@@ -49,11 +54,15 @@ def get_samyang_lens_list(scraping: IScrapingService) -> DataFrame:
                                 break
                         if temp3 == '':
                             temp3 = temp2[0]
-                    temp[th_element.text] = temp3.replace('\n', '')
+                    temp[th_element.text] = temp3
                 else:
                     temp[th_element.text] = td_element.text
             if len(temp) > 0:
                 temp_list.append(temp)
+    return temp_list
+
+
+def normalize_samyang_lens_list(temp_list: List[Dict[str, any]]) -> DataFrame:
     df = DataFrame.from_records(temp_list)
 
     # 変換用に整形
@@ -67,7 +76,7 @@ def get_samyang_lens_list(scraping: IScrapingService) -> DataFrame:
     del df['絞り羽根']
     del df['絞り羽根枚数']
     del df['付属品']
-    del df['JANコード：']
+    del df['JANコード:']
 
     w, t = extract_numbers(df['焦点距離'], [], [r'(\d+\.?\d*)mm'])
     df['wide_focal_length'] = [int(Decimal(x) * 2) for x in w]
@@ -75,9 +84,9 @@ def get_samyang_lens_list(scraping: IScrapingService) -> DataFrame:
     del df['焦点距離']
     del df['画角']
 
-    w, t = extract_numbers(df['name'], [], [r'F(\d+\.?\d*)'])
-    df['wide_f_number'] = [float(x) for x in w]
-    df['telephoto_f_number'] = [float(x) for x in t]
+    w, t = extract_number_arrays(df['name'], [], [r'F(\d+\.?\d*)'])
+    df['wide_f_number'] = check_number_array(w, df['name'], 'F値')
+    df['telephoto_f_number'] = check_number_array(t, df['name'], 'F値')
     del df['明るさ']
     del df['絞り']
 
@@ -195,3 +204,11 @@ def get_samyang_lens_list(scraping: IScrapingService) -> DataFrame:
     del df['質量']
     del df['重さ']
     return df
+
+
+def get_samyang_lens_list(scraping: IScrapingService) -> DataFrame:
+    lens_list = discover_samyang_lens_list(scraping)
+    return normalize_samyang_lens_list(fetch_samyang_lens_list(scraping, lens_list))
+
+
+register_maker(MakerPlugin('SAMYANG', discover_samyang_lens_list, fetch_samyang_lens_list, normalize_samyang_lens_list))
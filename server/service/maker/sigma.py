@@ -5,7 +5,11 @@ from pandas import DataFrame
 
 from model.DomObject import DomObject
 from service.i_scraping_service import IScrapingService
-from service.ulitity import extract_numbers, regex
+from service.maker_registry import register_maker, MakerPlugin
+from service.ulitity import extract_numbers, extract_number_arrays, regex, check_number_array
+
+# 現行のマイクロフォーサーズ用・ライカL用・生産終了品の(レンズ名, URL)の一覧
+SigmaLensList = Tuple[List[Tuple[str, str]], List[Tuple[str, str]], List[Tuple[str, str]]]
 
 
 def item_page_to_raw_dict(page: DomObject, lens_mount: str) -> Dict[str, any]:
@@ -26,21 +30,21 @@ def item_page_to_raw_dict(page: DomObject, lens_mount: str) -> Dict[str, any]:
         ul_element = div_element2.find('ul')
         if ul_element is None:
             # 項目が1個しかないので簡単
-            value = div_element2.text.strip().strip('\n').replace('\n', ' ')
+            value = div_element2.text
             output[key] = value
         else:
             # レンズマウントごとに分類されるので注意する
             for li_element in ul_element.find_all('li'):
                 if lens_mount_ == 'マイクロフォーサーズ' and 'マイクロフォーサーズ' in li_element.full_text:
-                    value = li_element.full_text.replace('マイクロフォーサーズマウント', '').strip().strip('\n').replace('\n', ' ')
+                    value = li_element.full_text.replace('マイクロフォーサーズマウント', '').strip()
                     output[key] = value
                 if lens_mount_ == 'ライカL' and 'L マウント' in li_element.full_text:
-                    value = li_element.full_text.replace('L マウント', '').strip().strip('\n').replace('\n', ' ')
+                    value = li_element.full_text.replace('L マウント', '').strip()
                     output[key] = value
     return output
 
 
-def get_sigma_lens_list(scraping: IScrapingService) -> DataFrame:
+def discover_sigma_lens_list(scraping: IScrapingService) -> SigmaLensList:
     # レンズのURL一覧を取得する
     page = scraping.get_page('https://www.sigma-global.com/jp/lenses/', cache=False)
     lens_list_mft: List[Tuple[str, str]] = []
@@ -69,6 +73,17 @@ def get_sigma_lens_list(scraping: IScrapingService) -> DataFrame:
         lens_name = a_element.find('h4 > span').text
         lens_list_old.append((lens_name, lens_link))
 
+    return lens_list_mft, lens_list_l, lens_list_old
+
+
+def fetch_sigma_lens_list(scraping: IScrapingService, lens_list: SigmaLensList) -> List[Dict[str, any]]:
+    lens_list_mft, lens_list_l, lens_list_old = lens_list
+
+    # 詳細ページをまとめて取得する
+    url_list = [x[1] for x in lens_list_mft + lens_list_l]
+    url_list += [x[1] for x in lens_list_old if 'DN' in x[0]]
+    page_dict: Dict[str, DomObject] = dict(scraping.iter_pages(url_list))
+
     # レンズごとに情報を取得する
     lens_raw_data_list: List[Dict[str, any]] = []
     for lens_list, lens_mount in [(lens_list_mft, 'マイクロフォーサーズ'), (lens_list_l, 'ライカL')]:
@@ -80,7 +95,7 @@ def get_sigma_lens_list(scraping: IScrapingService) -> DataFrame:
             else:
                 lens_name2 = lens_name
 
-            page = scraping.get_page(lens_link)
+            page = page_dict[lens_link]
             temp_dict: Dict[str, str] = {
                 'mount': lens_mount,
                 'name': lens_name2,
@@ -93,7 +108,7 @@ def get_sigma_lens_list(scraping: IScrapingService) -> DataFrame:
         if 'DN' not in lens_name:
             # DNが含まれない＝ミラーレス用ではないので除外
             continue
-        page = scraping.get_page(lens_link)
+        page = page_dict[lens_link]
         temp_dict: Dict[str, str] = {
             'mount': 'マイクロフォーサーズ',
             'name': lens_name,
@@ -103,6 +118,10 @@ def get_sigma_lens_list(scraping: IScrapingService) -> DataFrame:
         if len(temp_dict2) > 0:
             temp_dict.update(temp_dict2)
             lens_raw_data_list.append(temp_dict)
+    return lens_raw_data_list
+
+
+def normalize_sigma_lens_list(lens_raw_data_list: List[Dict[str, any]]) -> DataFrame:
     df = DataFrame.from_records(lens_raw_data_list)
 
     # 変換用に整形
@@ -135,14 +154,14 @@ def get_sigma_lens_list(scraping: IScrapingService) -> DataFrame:
     df['telephoto_focal_length'] = telephoto_focal_length
 
     # f_number
-    w, t = extract_numbers(df['name'], [r'F(\d+\.?\d*)-(\d+\.?\d*)'], [r'F(\d+\.?\d*)'])
-    df['wide_f_number'] = [float(x) for x in w]
-    df['telephoto_f_number'] = [float(x) for x in t]
+    w, t = extract_number_arrays(df['name'], [r'F(\d+\.?\d*)-(\d+\.?\d*)'], [r'F(\d+\.?\d*)'])
+    df['wide_f_number'] = check_number_array(w, df['name'], 'F値')
+    df['telephoto_f_number'] = check_number_array(t, df['name'], 'F値')
 
     # min_focus_distance
     w, t = extract_numbers(df['最短撮影距離'],
                            [r'(\d+\.?\d*)-(\d+\.?\d*)cm', r'(\d+\.?\d*) \(W\)-(\d+\.?\d*) \(T\)cm',
-                            r'(\d+\.?\d*)\(W\) - (\d+\.?\d*)\(T\)cm', f'(\d+\.?\d*)（W）-(\d+\.?\d*)（T）cm'],
+                            r'(\d+\.?\d*)\(W\) ?- ?(\d+\.?\d*)\(T\)cm'],
                            [r'(\d+\.?\d*)cm'])
 
     df['wide_min_focus_distance'] = [int(Decimal(x).scaleb(1)) for x in w]
@@ -152,14 +171,14 @@ def get_sigma_lens_list(scraping: IScrapingService) -> DataFrame:
     # max_photographing_magnification
     m: List[float] = []
     for record in df.to_records():
-        temp = regex(record['最大撮影倍率'].replace('：', ':'), r'.*1:(\d+\.?\d*).*1:(\d+\.?\d*).*')
+        temp = regex(record['最大撮影倍率'], r'.*1:(\d+\.?\d*).*1:(\d+\.?\d*).*')
         if len(temp) > 0:
             if float(temp[0]) < float(temp[1]):
                 denominator = temp[0]
             else:
                 denominator = temp[1]
         else:
-            temp = regex(record['最大撮影倍率'].replace('：', ':'), r'.*1:(\d+\.?\d*).*')
+            temp = regex(record['最大撮影倍率'], r'.*1:(\d+\.?\d*).*')
             denominator = temp[0]
         if record['mount'] == 'マイクロフォーサーズ':
             m.append(float((Decimal('2') / Decimal(denominator)).quantize(Decimal('0.01'))))
@@ -256,3 +275,11 @@ def get_sigma_lens_list(scraping: IScrapingService) -> DataFrame:
     del df['希望小売価格']
 
     return df
+
+
+def get_sigma_lens_list(scraping: IScrapingService) -> DataFrame:
+    lens_list = discover_sigma_lens_list(scraping)
+    return normalize_sigma_lens_list(fetch_sigma_lens_list(scraping, lens_list))
+
+
+register_maker(MakerPlugin('SIGMA', discover_sigma_lens_list, fetch_sigma_lens_list, normalize_sigma_lens_list))
@@ -0,0 +1,67 @@
+import importlib
+import pkgutil
+from dataclasses import dataclass, field
+from typing import Callable, Any, Dict, List
+
+from pandas import DataFrame
+
+from service.i_scraping_service import IScrapingService
+
+# 出力する際のメーカーの並び順(ここに無いメーカーは、この後ろに登録順で並べる)
+MAKER_NAME_LIST = ['Panasonic', 'OLYMPUS', 'SIGMA', 'LEICA', 'COSINA', 'LAOWA', 'SAMYANG', 'Other']
+
+# メーカーごとの処理を実装したモジュールが置かれているパッケージ
+MAKER_PACKAGE = 'service.maker'
+
+
+@dataclass
+class MakerPlugin:
+    """メーカーごとのレンズ情報の取得処理を、段階ごとにまとめたもの
+
+    discover 一覧ページなどから、取得すべきレンズの一覧を作成する
+    fetch 詳細ページなどから、レンズごとの生データを取得する
+    normalize 生データを、Lensの各列を持つDataFrameに整形する
+    input_file_list Webページ以外に入力として使うファイルの一覧
+    """
+    name: str
+    discover: Callable[[IScrapingService], Any]
+    fetch: Callable[[IScrapingService, Any], Any]
+    normalize: Callable[[Any], DataFrame]
+    input_file_list: List[str] = field(default_factory=list)
+
+
+maker_plugin_dict: Dict[str, MakerPlugin] = {}
+
+
+def register_maker(plugin: MakerPlugin) -> MakerPlugin:
+    """メーカーごとの処理を登録する(各モジュールの読み込み時に呼び出す)"""
+    maker_plugin_dict[plugin.name] = plugin
+    return plugin
+
+
+def load_maker_plugins() -> List[MakerPlugin]:
+    """メーカーごとの処理を実装したモジュールを全て読み込み、登録されたものを出力順に並べて返す"""
+    package = importlib.import_module(MAKER_PACKAGE)
+    for module_info in pkgutil.iter_modules(package.__path__):
+        importlib.import_module(f'{MAKER_PACKAGE}.{module_info.name}')
+    plugin_list = [maker_plugin_dict[x] for x in MAKER_NAME_LIST if x in maker_plugin_dict]
+    plugin_list += [x for x in maker_plugin_dict.values() if x.name not in MAKER_NAME_LIST]
+    return plugin_list
+
+
+def get_maker_plugins(maker_name_list: List[str]) -> List[MakerPlugin]:
+    """指定したメーカーの処理を出力順に並べて返す
+
+    Parameters
+    ----------
+    maker_name_list メーカー名の一覧
+
+    Returns
+    -------
+        メーカーごとの処理の一覧
+    """
+    plugin_list = load_maker_plugins()
+    unknown_maker_list = [x for x in maker_name_list if x not in maker_plugin_dict]
+    if len(unknown_maker_list) > 0:
+        raise ValueError(f'未対応のメーカーが指定されています: {unknown_maker_list}')
+    return [x for x in plugin_list if x.name in maker_name_list]
@@ -0,0 +1,98 @@
+import hashlib
+import importlib
+import inspect
+import json
+import pickle
+import zlib
+from typing import List, Tuple, Optional
+
+import pandas
+from pandas import DataFrame
+
+from service.i_database_service import IDataBaseService
+from service.i_scraping_service import IScrapingService
+from service.maker_registry import MakerPlugin
+
+# メーカーごとの処理以外で、整形結果に影響するモジュール
+DEPENDENCY_MODULE_LIST = ['service.ulitity', 'normalization', 'model.LxmlDomObject']
+
+
+def get_code_version(plugin: MakerPlugin) -> str:
+    """メーカーごとの処理のソースコードから、パーサーのバージョンを表すハッシュ値を計算する"""
+    file_path_set = set(inspect.getsourcefile(x) for x in [plugin.discover, plugin.fetch, plugin.normalize])
+    for module_name in DEPENDENCY_MODULE_LIST:
+        file_path_set.add(importlib.import_module(module_name).__file__)
+    h = hashlib.sha256(pandas.__version__.encode('UTF-8'))
+    for file_path in sorted(file_path_set):
+        with open(file_path, 'rb') as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+class MakerSnapshotService:
+    """メーカーごとの整形結果を、入力したWebページのハッシュ値と共に保存し、入力が変わらなければ再利用する"""
+
+    def __init__(self, database: IDataBaseService, scraping: IScrapingService):
+        self.database = database
+        self.scraping = scraping
+        self.database.query('CREATE TABLE IF NOT EXISTS maker_snapshot (maker TEXT PRIMARY KEY, code_version TEXT,'
+                            ' input_hash TEXT, access_list TEXT, data BLOB)')
+
+    def get_input_hash(self, plugin: MakerPlugin, access_list: List[Tuple[str, str, bool]], refresh: bool) -> str:
+        """入力したWebページやファイルの内容から、入力全体のハッシュ値を計算する
+
+        Parameters
+        ----------
+        plugin メーカーごとの処理
+        access_list 取得したWebページの(URL, 文字エンコーディング, キャッシュ設定)の一覧
+        refresh キャッシュをOFFにして取得したページを、改めて問い合わせるならTrue
+
+        Returns
+        -------
+            入力全体のハッシュ値
+        """
+        h = hashlib.sha256()
+        for url, encoding, cache in access_list:
+            page_hash = self.scraping.get_page_hash(url, encoding, cache or not refresh)
+            h.update(f'{url}\t{page_hash}\n'.encode('UTF-8'))
+        for file_path in plugin.input_file_list:
+            with open(file_path, 'rb') as f:
+                h.update(f'{file_path}\t{hashlib.sha256(f.read()).hexdigest()}\n'.encode('UTF-8'))
+        return h.hexdigest()
+
+    def load(self, plugin: MakerPlugin) -> Optional[DataFrame]:
+        """前回から入力もパーサーも変わっていなければ、前回の整形結果を返す
+
+        Parameters
+        ----------
+        plugin メーカーごとの処理
+
+        Returns
+        -------
+            前回の整形結果(再利用できない場合はNone)
+        """
+        record_list = self.database.select('SELECT code_version, input_hash, access_list, data FROM maker_snapshot'
+                                           ' WHERE maker=?', (plugin.name,))
+        if len(record_list) == 0:
+            return None
+        record = record_list[0]
+        if record['code_version'] != get_code_version(plugin):
+            return None
+        access_list = [tuple(x) for x in json.loads(record['access_list'])]
+        if record['input_hash'] != self.get_input_hash(plugin, access_list, True):
+            return None
+        return pickle.loads(zlib.decompress(record['data']))
+
+    def save(self, plugin: MakerPlugin, access_list: List[Tuple[str, str, bool]], df: DataFrame) -> None:
+        """整形結果を、その入力のハッシュ値と共に保存する
+
+        Parameters
+        ----------
+        plugin メーカーごとの処理
+        access_list 取得したWebページの(URL, 文字エンコーディング, キャッシュ設定)の一覧
+        df 整形結果
+        """
+        self.database.query('INSERT OR REPLACE INTO maker_snapshot (maker, code_version, input_hash, access_list, data)'
+                            ' VALUES (?, ?, ?, ?, ?)',
+                            (plugin.name, get_code_version(plugin), self.get_input_hash(plugin, access_list, False),
+                             json.dumps(access_list, ensure_ascii=False), zlib.compress(pickle.dumps(df))))
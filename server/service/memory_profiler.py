@@ -0,0 +1,153 @@
+import json
+import os
+import sys
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from typing import Dict, List, Any, Optional
+
+try:
+    import resource
+except ImportError:
+    # Windowsにはresourceモジュールが無いので、RSSは記録しない
+    resource = None
+
+# これが設定されていれば(空文字列・'0'以外なら)メモリの計測を有効にする環境変数
+MEMORY_PROFILE_ENV = 'MFT_MEMORY_PROFILE'
+
+# 計測結果の出力先
+MEMORY_PROFILE_PATH = 'memory_profile.json'
+
+# 処理ごとに記録する、確保したメモリが多い箇所の数
+MEMORY_TOP_COUNT = 10
+
+# tracemallocで記録する呼び出し元のフレーム数
+MEMORY_TRACE_FRAMES = 1
+
+# 確保量が多い箇所から除く、計測処理自身による確保
+TRACE_FILTER_LIST = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, __file__),
+]
+
+
+def is_memory_profile_env_enabled() -> bool:
+    """環境変数でメモリの計測が有効にされているかを返す"""
+    return os.environ.get(MEMORY_PROFILE_ENV, '') not in ('', '0')
+
+
+def get_peak_rss() -> Optional[int]:
+    """プロセスのこれまでの最大RSSをバイト数で返す(取得できなければNone)"""
+    if resource is None:
+        return None
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOSはバイト単位、Linuxはキロバイト単位で返す
+    return peak_rss if sys.platform == 'darwin' else peak_rss * 1024
+
+
+class MemoryProfiler:
+    """処理ごとのメモリ使用量(tracemallocで追跡した量のピーク・増減と、確保量が多い箇所)と最大RSSを記録する
+
+    tracemallocのピークはプロセス全体で1つなので、処理が並列に動いていると他の処理の分も含まれてしまう。
+    正確に計測するには、メーカーごとの処理を1つずつ実行すること。
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.lock = threading.Lock()
+        # [名前, 開始時のスナップショット, 開始時の使用量, それまでのピーク]
+        self.stack: List[list] = []
+        self.section_list: List[Dict[str, Any]] = []
+
+    def enable(self) -> None:
+        """計測を有効にし、tracemallocでの追跡を始める"""
+        with self.lock:
+            self.stack = []
+            self.section_list = []
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(MEMORY_TRACE_FRAMES)
+        self.enabled = True
+
+    def disable(self) -> None:
+        """計測を無効にし、tracemallocでの追跡を止める"""
+        self.enabled = False
+        tracemalloc.stop()
+
+    @contextmanager
+    def section(self, name: str):
+        """withブロック内の処理のメモリ使用量を、指定した名前の処理として記録する
+
+        Parameters
+        ----------
+        name 処理の名前(入れ子になっている場合は、外側の処理の名前と「/」でつないで記録する)
+        """
+        if not self.enabled:
+            yield
+            return
+        with self.lock:
+            _, peak = tracemalloc.get_traced_memory()
+            if len(self.stack) > 0:
+                # ピークを処理ごとに測り直すので、外側の処理のそれまでのピークを退避しておく
+                self.stack[-1][3] = max(self.stack[-1][3], peak)
+                path = f'{self.stack[-1][0]}/{name}'
+            else:
+                path = name
+            # スナップショットの作成自体で使うメモリを含めないよう、作成してから使用量を測る
+            snapshot = tracemalloc.take_snapshot().filter_traces(TRACE_FILTER_LIST)
+            current, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            frame = [path, snapshot, current, current]
+            self.stack.append(frame)
+        try:
+            yield
+        finally:
+            with self.lock:
+                current, peak = tracemalloc.get_traced_memory()
+                peak = max(frame[3], peak)
+                self.stack.remove(frame)
+                if len(self.stack) > 0:
+                    self.stack[-1][3] = max(self.stack[-1][3], peak)
+                snapshot = tracemalloc.take_snapshot().filter_traces(TRACE_FILTER_LIST)
+                statistic_list = snapshot.compare_to(frame[1], 'lineno')
+                self.section_list.append({
+                    'name': path,
+                    'start': frame[2],
+                    'end': current,
+                    'diff': current - frame[2],
+                    'peak': peak,
+                    'peak_over_start': peak - frame[2],
+                    'peak_rss': get_peak_rss(),
+                    'top': [{
+                        'location': f'{x.traceback[0].filename}:{x.traceback[0].lineno}',
+                        'size_diff': x.size_diff,
+                        'count_diff': x.count_diff,
+                    } for x in statistic_list[:MEMORY_TOP_COUNT]],
+                })
+
+    def get_report(self) -> Dict[str, Any]:
+        """記録結果を、処理が終わった順に並べて返す"""
+        with self.lock:
+            return {
+                'peak_rss': get_peak_rss(),
+                'traced_peak': max([x['peak'] for x in self.section_list], default=0),
+                'sections': list(self.section_list),
+            }
+
+    def print_summary(self) -> None:
+        """処理ごとのメモリ使用量を表示する"""
+        report = self.get_report()
+        print('【メモリ使用量】')
+        print(f"{'section':<30} {'peak MiB':>9} {'diff MiB':>9} {'RSS MiB':>9}")
+        for section in report['sections']:
+            rss = f"{section['peak_rss'] / 1024 / 1024:9.1f}" if section['peak_rss'] is not None else f"{'-':>9}"
+            print(f"{section['name']:<30} {section['peak'] / 1024 / 1024:9.1f} {section['diff'] / 1024 / 1024:9.1f}"
+                  f" {rss}")
+
+    def write_report(self, path: str = MEMORY_PROFILE_PATH) -> None:
+        """記録結果をJSONファイルに書き込む"""
+        with open(path, 'w', encoding='UTF-8') as f:
+            json.dump(self.get_report(), f, ensure_ascii=False, indent=2)
+
+
+# プロセス全体で共有する計測用のインスタンス
+memory_profiler = MemoryProfiler()
@@ -0,0 +1,101 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import List, Callable, Any, Optional
+
+from pandas import DataFrame
+
+from service.i_scraping_service import IScrapingService
+from service.maker_registry import MakerPlugin
+from service.maker_snapshot_service import MakerSnapshotService
+from service.memory_profiler import memory_profiler
+from profiler import profiler
+from service.recording_scraping_service import RecordingScrapingService
+
+
+@dataclass
+class StageTime:
+    """ある段階の処理に掛かった時間"""
+    maker: str
+    stage: str
+    seconds: float
+
+
+class PipelineRunner:
+    """メーカーごとの処理を段階ごとに実行し、それぞれの所要時間を記録する"""
+
+    def __init__(self, scraping: IScrapingService, jobs: int = 1, snapshot: Optional[MakerSnapshotService] = None,
+                 incremental: bool = True):
+        """
+        Parameters
+        ----------
+        scraping スクレイピング用のサービス
+        jobs メーカーごとの処理を並列に実行する数
+        snapshot メーカーごとの整形結果を保存するサービス(Noneなら保存しない)
+        incremental 入力が前回から変わっていないメーカーについて、前回の整形結果を再利用するならTrue
+        """
+        self.scraping = scraping
+        self.jobs = max(jobs, 1)
+        self.snapshot = snapshot
+        self.incremental = incremental
+        self.lock = threading.Lock()
+        self.stage_time_list: List[StageTime] = []
+        # 所要時間を表示する際のメーカーの順番(runに渡された処理の順番)
+        self.maker_name_list: List[str] = []
+
+    def run_stage(self, maker: str, stage: str, func: Callable[..., Any], *args) -> Any:
+        """1つの段階を実行し、所要時間を記録する"""
+        start = time.perf_counter()
+        with profiler.section(stage), memory_profiler.section(stage):
+            result = func(*args)
+        with self.lock:
+            self.stage_time_list.append(StageTime(maker, stage, time.perf_counter() - start))
+        return result
+
+    def run_maker(self, plugin: MakerPlugin) -> DataFrame:
+        """1メーカー分の処理を、全段階について順番に実行する"""
+        with profiler.section(plugin.name), memory_profiler.section(plugin.name):
+            return self._run_maker(plugin)
+
+    def _run_maker(self, plugin: MakerPlugin) -> DataFrame:
+        print(f'【{plugin.name}】')
+        if self.snapshot is not None and self.incremental:
+            df = self.run_stage(plugin.name, 'check', self.snapshot.load, plugin)
+            if df is not None:
+                print(f'{plugin.name}: 入力に変化が無いので、前回の整形結果を再利用します')
+                return df
+
+        # 入力したWebページを記録しておき、次回の実行時に変化が無いかを調べられるようにする
+        scraping = RecordingScrapingService(self.scraping)
+        lens_list = self.run_stage(plugin.name, 'discover', plugin.discover, scraping)
+        raw_data = self.run_stage(plugin.name, 'fetch', plugin.fetch, scraping, lens_list)
+        df = self.run_stage(plugin.name, 'normalize', plugin.normalize, raw_data)
+        if self.snapshot is not None:
+            self.snapshot.save(plugin, scraping.access_list, df)
+        return df
+
+    def run(self, plugin_list: List[MakerPlugin]) -> List[DataFrame]:
+        """複数メーカー分の処理を実行する
+
+        Parameters
+        ----------
+        plugin_list メーカーごとの処理の一覧
+
+        Returns
+        -------
+            メーカーごとの処理結果(plugin_listと同じ順番)
+        """
+        self.maker_name_list += [x.name for x in plugin_list if x.name not in self.maker_name_list]
+        with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            future_list = [executor.submit(self.run_maker, x) for x in plugin_list]
+            return [x.result() for x in future_list]
+
+    def print_stage_time(self) -> None:
+        """段階ごとの所要時間を、メーカーの処理の登録順・段階の実行順に並べて表示する"""
+        print('【所要時間】')
+        stage_order = ['check', 'discover', 'fetch', 'normalize']
+        maker_order = {x: i for i, x in enumerate(self.maker_name_list)}
+        for stage_time in sorted(self.stage_time_list, key=lambda x: (maker_order.get(x.maker, len(maker_order)),
+                                                                      stage_order.index(x.stage))):
+            print(f'{stage_time.maker:<10} {stage_time.stage:<10} {stage_time.seconds:8.2f}s')
@@ -0,0 +1,45 @@
+import threading
+from typing import Iterable, Iterator, Tuple, List, Set
+
+from model import DomObject
+from service.i_scraping_service import IScrapingService
+
+
+class RecordingScrapingService(IScrapingService):
+    """取得したWebページの(URL, 文字エンコーディング, キャッシュ設定)を記録するラッパークラス"""
+
+    def __init__(self, scraping: IScrapingService):
+        self.scraping = scraping
+        self.lock = threading.Lock()
+        self.access_list: List[Tuple[str, str, bool]] = []
+        self.access_set: Set[Tuple[str, str, bool]] = set()
+
+    def _record(self, url_list: Iterable[str], encoding: str, cache: bool) -> None:
+        with self.lock:
+            for url in url_list:
+                access = (url, encoding, cache)
+                if access not in self.access_set:
+                    self.access_list.append(access)
+                    self.access_set.add(access)
+
+    def get_page(self, url: str, encoding='', cache=True) -> DomObject:
+        self._record([url], encoding, cache)
+        return self.scraping.get_page(url, encoding, cache)
+
+    def get_page_hash(self, url: str, encoding='', cache=True) -> str:
+        self._record([url], encoding, cache)
+        return self.scraping.get_page_hash(url, encoding, cache)
+
+    def get_pages(self, url_list: Iterable[str], encoding='', cache=True) -> List[DomObject]:
+        url_list = list(url_list)
+        self._record(url_list, encoding, cache)
+        return self.scraping.get_pages(url_list, encoding, cache)
+
+    def iter_pages(self, url_list: Iterable[str], encoding='', cache=True) -> Iterator[Tuple[str, DomObject]]:
+        url_list = list(url_list)
+        self._record(url_list, encoding, cache)
+        return self.scraping.iter_pages(url_list, encoding, cache)
+
+    def close(self) -> None:
+        # 元のインスタンスは呼び出し元が管理しているので、ここでは閉じない
+        pass
@@ -1,26 +1,69 @@
-from sqlite3 import connect
-from typing import List, Dict
+import threading
+from sqlite3 import connect, Connection, Row
+from typing import List, Dict, Optional, Iterator
 
 from service.i_database_service import IDataBaseService
 
+# PRAGMA synchronousに指定できる値
+SYNCHRONOUS_LIST = ['OFF', 'NORMAL', 'FULL', 'EXTRA']
+
 
 class SqliteDataBaseService(IDataBaseService):
-    def __init__(self, database_file_path: str, **kwargs):
+    def __init__(self, database_file_path: str, synchronous: str = 'NORMAL', cache_size: int = -16000, **kwargs):
+        """
+        Parameters
+        ----------
+        database_file_path データベースファイルのパス
+        synchronous PRAGMA synchronousの値(WALモードならNORMALでも安全)
+        cache_size PRAGMA cache_sizeの値(負数ならKiB単位)
+        """
         super().__init__(**kwargs)
+        # PRAGMAの値はSQL文に埋め込むので、想定外の値が入らないよう事前に確認しておく
+        if not isinstance(synchronous, str) or synchronous.upper() not in SYNCHRONOUS_LIST:
+            raise ValueError(f'未対応のsynchronousの値です: {synchronous}')
         self.db_file_path = database_file_path
+        self.synchronous = synchronous.upper()
+        self.cache_size = int(cache_size)
+        # 接続はスレッドごとに1つ作成して使い回す
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.connection_list: List[Connection] = []
+
+    def _get_connection(self) -> Connection:
+        conn: Optional[Connection] = getattr(self.local, 'connection', None)
+        if conn is None:
+            conn = connect(self.db_file_path, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(f'PRAGMA synchronous={self.synchronous}')
+            conn.execute(f'PRAGMA cache_size={self.cache_size}')
+            self.local.connection = conn
+            with self.lock:
+                self.connection_list.append(conn)
+        return conn
 
     def select(self, query: str, parameter=()) -> List[Dict[str, any]]:
-        with connect(self.db_file_path) as conn:
-            cur = conn.cursor()
+        return list(self.select_iter(query, parameter))
+
+    def select_iter(self, query: str, parameter=(), batch_size: int = 1000, row_type: str = 'dict') -> Iterator[any]:
+        if row_type not in ('dict', 'tuple', 'row'):
+            raise ValueError(f'未対応の行形式です: {row_type}')
+        cur = self._get_connection().cursor()
+        if row_type == 'row':
+            cur.row_factory = Row
+        try:
             cur.execute(query, parameter)
             columns = [description[0] for description in cur.description]
-            output: List[Dict[str, any]] = []
-            for row in cur.fetchall():
-                temp: Dict[str, any] = {}
-                for c, d in zip(columns, row):
-                    temp[c] = d
-                output.append(temp)
-            return output
+            while True:
+                rows = cur.fetchmany(batch_size)
+                if len(rows) == 0:
+                    break
+                if row_type == 'dict':
+                    for row in rows:
+                        yield dict(zip(columns, row))
+                else:
+                    yield from rows
+        finally:
+            cur.close()
 
     def query(self, query: str, parameter=()) -> None:
         self.many_query([query], [parameter])
@@ -32,8 +75,18 @@ class SqliteDataBaseService(IDataBaseService):
                 parameter.append(())
         if len(query) != len(parameter):
             return
-        with connect(self.db_file_path) as conn:
+        with self._get_connection() as conn:
             cur = conn.cursor()
-            for q, p in zip(query, parameter):
-                cur.execute(q, p)
-            conn.commit()
+            try:
+                for q, p in zip(query, parameter):
+                    cur.execute(q, p)
+            finally:
+                cur.close()
+
+    def close(self) -> None:
+        with self.lock:
+            for conn in self.connection_list:
+                conn.close()
+            self.connection_list = []
+        # 別スレッドが持っている接続への参照は、次回使用時に作り直させる
+        self.local = threading.local()
@@ -1,23 +1,87 @@
 import re
-from typing import List, Tuple, Dict
+from functools import lru_cache
+from typing import List, Tuple, Dict, Pattern, Callable
 
+import numpy
+import pandas
 from pandas import Series, DataFrame
 
+from normalization import FULL_WIDTH_TABLE
+from profiler import profiler
+
+
+@lru_cache(maxsize=None)
+def compile_pattern(pattern: str) -> Pattern:
+    """正規表現をコンパイルする(同じパターンは1度しかコンパイルしない)"""
+    return re.compile(pattern, re.MULTILINE)
+
 
 def regex(text: str, pattern: str) -> List[str]:
     """グループ入り正規表現にマッチさせて、ヒットした場合はそれぞれの文字列の配列、そうでない場合は空配列を返す"""
     output: List[str] = []
-    for m in re.finditer(pattern, text, re.MULTILINE):
+    for m in compile_pattern(pattern).finditer(text):
         for x in m.groups():
             output.append(x)
     return output
 
 
+def extract_matches(series: Series, pair_data_patterns: List[str], single_data_patterns: List[str])\
+        -> Tuple[Series, Series]:
+    """ある列について、その各行に含まれる文字列から、数字を1つないし2つ抽出する。
+    パターンは先頭から順に試し、行ごとに最初にマッチしたパターンの、最初のマッチ箇所を採用する。
+    行ごとにループせず、パターンごとに列全体へまとめて適用する
+
+    Parameters
+    ----------
+    series ある列
+    pair_data_pattern 数字が2つ存在する場合のパターン(グループを2つ以上持つこと)
+    single_data_pattern 数字が1つ存在する場合のパターン
+
+    Returns
+    -------
+    抽出した文字列の列A・列B(マッチしなかった行はNaN)
+    """
+    # 行の位置で書き込むことで、インデックスに重複があっても扱えるようにする
+    values = series.to_numpy(dtype=object)
+    array_a = numpy.full(len(values), numpy.nan, dtype=object)
+    array_b = numpy.full(len(values), numpy.nan, dtype=object)
+
+    # まだどのパターンにもマッチしていない行(の位置)
+    rest_position = numpy.array([i for i, x in enumerate(values) if isinstance(x, str)], dtype=int)
+    rest = Series(values[rest_position], dtype=object)
+
+    # 数字が2つ存在する場合のパターン
+    for pair_data_pattern in pair_data_patterns:
+        if len(rest) == 0:
+            break
+        result = rest.str.extract(compile_pattern(pair_data_pattern), expand=True)
+        hit = (result[0].notna() & result[1].notna()).to_numpy()
+        array_a[rest_position[hit]] = result[0].to_numpy(dtype=object)[hit]
+        array_b[rest_position[hit]] = result[1].to_numpy(dtype=object)[hit]
+        rest_position = rest_position[~hit]
+        rest = rest[~hit].reset_index(drop=True)
+
+    # 数字が1つ存在する場合のパターン
+    for single_data_pattern in single_data_patterns:
+        if len(rest) == 0:
+            break
+        result = rest.str.extract(compile_pattern(single_data_pattern), expand=True)
+        hit = result[0].notna().to_numpy()
+        array_a[rest_position[hit]] = result[0].to_numpy(dtype=object)[hit]
+        array_b[rest_position[hit]] = result[0].to_numpy(dtype=object)[hit]
+        rest_position = rest_position[~hit]
+        rest = rest[~hit].reset_index(drop=True)
+
+    return Series(array_a, index=series.index, dtype=object), Series(array_b, index=series.index, dtype=object)
+
+
+@profiler.profiled('extract_numbers')
 def extract_numbers(series: Series, pair_data_patterns: List[str], single_data_patterns: List[str])\
         -> Tuple[List[str], List[str]]:
     """ある列について、その各行に含まれる文字列から、数字を1つないし2つ抽出して、リストにまとめる。
     数字が2つ→リストA・リストBにそれぞれの数字を追加
     数字が1つ→リストA・リストBに同じ数字を追加
+    マッチしない→リストA・リストBに空文字列を追加
 
     Parameters
     ----------
@@ -29,41 +93,139 @@ def extract_numbers(series: Series, pair_data_patterns: List[str], single_data_p
     -------
     分析後のリストA・リストB
     """
+    series_a, series_b = extract_matches(series, pair_data_patterns, single_data_patterns)
+    return series_a.fillna('').tolist(), series_b.fillna('').tolist()
 
-    list_a: List[str] = []
-    list_b: List[str] = []
-    for data_line in series.values:
-        if data_line != data_line:
-            list_a.append('')
-            list_b.append('')
-            continue
-        flg = False
-
-        # 数字が2つ存在する場合のパターン
-        for pair_data_pattern in pair_data_patterns:
-            result = regex(data_line, pair_data_pattern)
-            if len(result) >= 2:
-                list_a.append(result[0])
-                list_b.append(result[1])
-                flg = True
-                break
-        if flg:
-            continue
 
-        # 数字が1つ存在する場合のパターン
-        for single_data_pattern in single_data_patterns:
-            result = regex(data_line, single_data_pattern)
-            if len(result) >= 1:
-                list_a.append(result[0])
-                list_b.append(result[0])
-                flg = True
-                break
-        if flg:
-            continue
+def to_number_array(series: Series) -> numpy.ndarray:
+    """文字列の列を実数の配列に変換する(桁区切りのカンマは取り除き、変換できないものはNaNにする)"""
+    text = series.astype(str).str.replace(',', '', regex=False)
+    return pandas.to_numeric(text, errors='coerce').to_numpy(dtype=numpy.float64)
+
+
+@profiler.profiled('extract_number_arrays')
+def extract_number_arrays(series: Series, pair_data_patterns: List[str], single_data_patterns: List[str])\
+        -> Tuple[numpy.ndarray, numpy.ndarray]:
+    """extract_numbersと同様に数字を抽出し、実数の配列A・配列Bとして返す(マッチしなかった行はNaN)
+
+    Parameters
+    ----------
+    series ある列
+    pair_data_pattern 数字が2つ存在する場合のパターン
+    single_data_pattern 数字が1つ存在する場合のパターン
+
+    Returns
+    -------
+    分析後の配列A・配列B
+    """
+    series_a, series_b = extract_matches(series, pair_data_patterns, single_data_patterns)
+    return to_number_array(series_a), to_number_array(series_b)
+
 
-    return list_a, list_b
+def check_number_array(array: numpy.ndarray, name_series: Series, column: str) -> numpy.ndarray:
+    """実数の配列に、値が得られなかった行(NaN)が無いかを調べる(あれば、そのレンズ名を添えて例外を投げる)
 
+    Parameters
+    ----------
+    array 実数の配列
+    name_series 各行のレンズ名
+    column エラーメッセージに表示する項目名
+
+    Returns
+    -------
+    渡した配列そのもの
+    """
+    invalid = numpy.isnan(array)
+    if invalid.any():
+        name_list = name_series.to_numpy(dtype=object)[invalid]
+        raise ValueError(f'{column}を読み取れませんでした: {", ".join(str(x) for x in name_list)}')
+    return array
+
+
+def to_int_array(array: numpy.ndarray, name_series: Series, column: str) -> numpy.ndarray:
+    """実数の配列を整数の配列にする(値が得られなかった行があれば、そのレンズ名を添えて例外を投げる)
+
+    Parameters
+    ----------
+    array 実数の配列
+    name_series 各行のレンズ名
+    column エラーメッセージに表示する項目名
+
+    Returns
+    -------
+    整数の配列
+    """
+    return check_number_array(array, name_series, column).astype(int)
+
+
+# 数値部分のパターン(「1,050」のような桁区切りのカンマと、「0,7」のような小数点のカンマの両方を受け付ける)
+SPEC_NUMBER_PATTERN = r'(?:\d{1,3}(?:,\d{3})+|\d+)(?:[.,]\d+)?'
 
+# 単位ごとの、(数値・単位の2グループを持つパターンの一覧, 単位の表記ごとの換算処理)
+SPEC_UNIT_DICT: Dict[str, Tuple[List[str], Dict[str, Callable[[numpy.ndarray], numpy.ndarray]]]] = {
+    'mm': ([rf'({SPEC_NUMBER_PATTERN})\s*(mm|cm|m)(?![a-zA-Z])'],
+           {'mm': lambda x: x, 'cm': lambda x: x * 10, 'm': lambda x: x * 1000}),
+    'g': ([rf'({SPEC_NUMBER_PATTERN})\s*(kg|g)(?![a-zA-Z])'],
+          {'g': lambda x: x, 'kg': lambda x: x * 1000}),
+    'yen': ([rf'[￥¥]\s*({SPEC_NUMBER_PATTERN})()', rf'({SPEC_NUMBER_PATTERN})\s*(円)'],
+            {'': lambda x: x, '円': lambda x: x}),
+    'ratio': ([rf'1\s*:\s*({SPEC_NUMBER_PATTERN})()', rf'({SPEC_NUMBER_PATTERN})\s*(倍)'],
+              {'': lambda x: 1 / x, '倍': lambda x: x}),
+}
+
+# 換算後の値を丸める桁数(「0.29m→290mm」のような換算で、浮動小数点数の誤差で切り捨て結果がずれないようにする)
+SPEC_VALUE_DECIMALS = 6
+
+
+@profiler.profiled('parse_spec_values')
+def parse_spec_values(series: Series, unit: str) -> Tuple[numpy.ndarray, numpy.ndarray]:
+    """ある列について、その各行に含まれる単位付きの数値を、指定した単位に換算した配列にする。
+    全角の数字・記号も受け付ける。パターンは優先順に試し、各行で最初にマッチしたパターンの、最初のマッチ箇所を採用する
+
+    Parameters
+    ----------
+    series ある列
+    unit 換算先の単位(mm・g・yen・ratio)。mmはm・cm、gはkg、yenは「￥」「円」、ratioは「1:x」「x倍」を受け付ける
+
+    Returns
+    -------
+    換算後の実数の配列と、値が得られたかどうかの配列(値が得られなかった行はNaN)
+    """
+    pattern_list, converter_dict = SPEC_UNIT_DICT[unit]
+    series = series.reset_index(drop=True)
+    text = series[[isinstance(x, str) for x in series.values]]
+    if len(text) == 0:
+        return numpy.full(len(series), numpy.nan), numpy.zeros(len(series), dtype=bool)
+    text = text.str.translate(FULL_WIDTH_TABLE)
+
+    # パターンを優先順に試し、まだどのパターンにもマッチしていない行にだけ次のパターンを適用する
+    value = Series(numpy.nan, index=text.index, dtype=object)
+    token = Series(numpy.nan, index=text.index, dtype=object)
+    for pattern in pattern_list:
+        rest = text[value.isna()]
+        if len(rest) == 0:
+            break
+        result = rest.str.extract(compile_pattern(pattern), expand=True)
+        value = value.fillna(result[0])
+        token = token.fillna(result[1])
+    value = value.reindex(series.index)
+    token = token.reindex(series.index)
+
+    # 桁区切りのカンマを取り除き、小数点のカンマはピリオドにする
+    value = value.str.replace(r',(?=\d{3}(?!\d))', '', regex=True).str.replace(',', '.', regex=False) \
+        if value.notna().any() else value
+    number = pandas.to_numeric(value, errors='coerce').to_numpy(dtype=numpy.float64, copy=True)
+    token = token.to_numpy(dtype=object)
+    with numpy.errstate(divide='ignore'):
+        for key, converter in converter_dict.items():
+            mask = token == key
+            number[mask] = converter(number[mask])
+    number = numpy.round(number, SPEC_VALUE_DECIMALS)
+    number[~numpy.isfinite(number)] = numpy.nan
+    return number, ~numpy.isnan(number)
+
+
+@profiler.profiled('convert_columns')
 def convert_columns(df: DataFrame, rename_columns: Dict[str, str], delete_columns: List[str]) -> DataFrame:
     """DataFrameのカラム名を変換する
 
@@ -77,18 +239,21 @@ def convert_columns(df: DataFrame, rename_columns: Dict[str, str], delete_column
     -------
     加工後のDataFrame
     """
-    temp: List[Dict[str, any]] = []
-    for record in df.to_dict(orient='records'):
-        record: Dict[str, any] = record
-        record2: Dict[str, any] = {}
-        for key, val in record.items():
-            if key in delete_columns:
-                continue
-            if val != val:
-                continue
-            if key in rename_columns:
-                record2[rename_columns[key]] = val
-            else:
-                record2[key] = val
-        temp.append(record2)
-    return DataFrame.from_records(temp)
+    # 変換後のカラムごとに、元になるカラムの位置をまとめる(カラム名が重複していてもよいよう、位置で扱う)
+    source_dict: Dict[str, List[int]] = {}
+    for i, column in enumerate(df.columns):
+        if column in delete_columns:
+            continue
+        source_dict.setdefault(rename_columns.get(column, column), []).append(i)
+
+    # 複数のカラムが同じカラムに変換される場合、NaNでない値のうち後ろのカラムのものを採用する
+    df = df.reset_index(drop=True)
+    output: Dict[str, Series] = {}
+    for column, index_list in source_dict.items():
+        series: Series = df.iloc[:, index_list[-1]]
+        for i in reversed(index_list[:-1]):
+            series = series.combine_first(df.iloc[:, i])
+        # 全ての値がNaNのカラムは残さない
+        if series.notna().any():
+            output[column] = series
+    return DataFrame(output, index=df.index).infer_objects()
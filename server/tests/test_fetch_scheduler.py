@@ -0,0 +1,39 @@
+import threading
+import time
+
+import pytest
+
+from service.fetch_scheduler import FetchScheduler
+
+
+def test_map_as_completed_stops_remaining_urls_on_error():
+    scheduler = FetchScheduler(interval=0.0, max_workers=1)
+    lock = threading.Lock()
+    called_list = []
+
+    def fetch(url):
+        with lock:
+            called_list.append(url)
+        if url.endswith('/0'):
+            raise RuntimeError(url)
+        # 間隔を空けながらの取得を模して、少し時間を掛ける
+        time.sleep(0.05)
+        return url
+
+    url_list = [f'http://host{h}.example/{i}' for h in range(3) for i in range(5)]
+    with pytest.raises(RuntimeError):
+        for _ in scheduler.map_as_completed(fetch, url_list):
+            pass
+    scheduler.shutdown()
+
+    # 最初のホストの処理中に止まり、待ち行列に残っていた他のホストの処理は取り消される
+    assert len(called_list) <= 2
+    assert all(x.startswith('http://host0.example/') for x in called_list)
+
+
+def test_map_as_completed_returns_all_results():
+    scheduler = FetchScheduler(interval=0.0, max_workers=4)
+    url_list = [f'http://host{h}.example/{i}' for h in range(3) for i in range(5)]
+    result_list = list(scheduler.map_as_completed(lambda x: x.upper(), url_list))
+    scheduler.shutdown()
+    assert sorted(result_list) == sorted((x, x.upper()) for x in url_list)
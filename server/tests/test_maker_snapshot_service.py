@@ -0,0 +1,34 @@
+import shutil
+import sys
+import types
+
+import normalization
+from service.maker_registry import MakerPlugin
+from service.maker_snapshot_service import get_code_version
+
+
+def discover(scraping):
+    return []
+
+
+def fetch(scraping, lens_list):
+    return []
+
+
+def normalize(raw_data):
+    return None
+
+
+def test_code_version_changes_with_normalization(tmp_path, monkeypatch):
+    file_path = tmp_path / 'normalization.py'
+    shutil.copyfile(normalization.__file__, file_path)
+    module = types.ModuleType('normalization')
+    module.__dict__.update(normalization.__dict__)
+    module.__file__ = str(file_path)
+    monkeypatch.setitem(sys.modules, 'normalization', module)
+    plugin = MakerPlugin('TEST', discover, fetch, normalize, [])
+
+    version = get_code_version(plugin)
+    assert get_code_version(plugin) == version
+    file_path.write_text(file_path.read_text(encoding='UTF-8') + '\n# changed\n', encoding='UTF-8')
+    assert get_code_version(plugin) != version
@@ -0,0 +1,16 @@
+import pytest
+
+from service.sqlite_database_service import SqliteDataBaseService
+
+
+def test_pragma_values_are_validated(tmp_path):
+    database = SqliteDataBaseService(str(tmp_path / 'test.db'), synchronous='full', cache_size='-2000')
+    assert database.synchronous == 'FULL'
+    assert database.cache_size == -2000
+    assert database.select('PRAGMA synchronous') == [{'synchronous': 2}]
+    assert database.select('PRAGMA cache_size') == [{'cache_size': -2000}]
+    database.close()
+    with pytest.raises(ValueError):
+        SqliteDataBaseService(str(tmp_path / 'test.db'), synchronous='OFF; DROP TABLE page')
+    with pytest.raises(ValueError):
+        SqliteDataBaseService(str(tmp_path / 'test.db'), cache_size='1; DROP TABLE page')
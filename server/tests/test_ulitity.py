@@ -0,0 +1,75 @@
+import numpy
+import pytest
+from pandas import Series
+
+from service.ulitity import extract_numbers, extract_number_arrays, to_int_array, check_number_array, \
+    parse_spec_values
+
+
+def test_extract_number_arrays_with_duplicated_index():
+    series = Series(['12-60mm', '25mm', '不明'], index=[0, 1, 0])
+    w, t = extract_number_arrays(series, [r'(\d+)-(\d+)mm'], [r'(\d+)mm'])
+    numpy.testing.assert_array_equal(w, [12.0, 25.0, numpy.nan])
+    numpy.testing.assert_array_equal(t, [60.0, 25.0, numpy.nan])
+
+
+def test_extract_numbers_with_duplicated_index():
+    series = Series(['F2.8-4', None, 'F1.7'], index=[1, 1, 0])
+    w, t = extract_numbers(series, [r'F(\d+\.?\d*)-(\d+\.?\d*)'], [r'F(\d+\.?\d*)'])
+    assert w == ['2.8', '', '1.7']
+    assert t == ['4', '', '1.7']
+
+
+def test_to_int_array_raises_with_lens_name():
+    with pytest.raises(ValueError, match='LENS B'):
+        to_int_array(numpy.array([12.0, numpy.nan]), Series(['LENS A', 'LENS B'], index=[0, 0]), '焦点距離')
+    numpy.testing.assert_array_equal(to_int_array(numpy.array([12.0, 25.0]), Series(['A', 'B']), '焦点距離'), [12, 25])
+
+
+def test_check_number_array_raises_with_lens_name():
+    w, _ = extract_number_arrays(Series(['LENS 25mm F1.7', 'LENS 12mm']), [], [r'F(\d+\.?\d*)'])
+    with pytest.raises(ValueError, match='LENS 12mm'):
+        check_number_array(w, Series(['LENS 25mm F1.7', 'LENS 12mm']), 'F値')
+
+
+def assert_spec_values(text_list, unit, expected_list):
+    value, valid = parse_spec_values(Series(text_list), unit)
+    numpy.testing.assert_array_equal(value, expected_list)
+    numpy.testing.assert_array_equal(valid, [not numpy.isnan(x) for x in expected_list])
+
+
+def test_parse_spec_values_mm():
+    assert_spec_values(['約0.29m', '15cm', '350 mm', '1.2m(W)', '-', None], 'mm',
+                       [290.0, 150.0, 350.0, 1200.0, numpy.nan, numpy.nan])
+
+
+def test_parse_spec_values_g():
+    assert_spec_values(['約455g', '1,875g(三脚座除く)', '1.2kg', '不明'], 'g', [455.0, 1875.0, 1200.0, numpy.nan])
+
+
+def test_parse_spec_values_yen():
+    assert_spec_values(['￥150,000(税別)', '98,000円', 'オープン価格'], 'yen', [150000.0, 98000.0, numpy.nan])
+
+
+def test_parse_spec_values_yen_prefers_pattern_order():
+    # 「円」の方が先に現れても、優先順が上の「￥」の表記を採用する
+    assert_spec_values(['税込 165,000円 / ￥150,000(税別)'], 'yen', [150000.0])
+
+
+def test_parse_spec_values_ratio():
+    assert_spec_values(['1:4', '0.5倍', '1 : 2.5'], 'ratio', [0.25, 0.5, 0.4])
+
+
+def test_parse_spec_values_ratio_prefers_pattern_order():
+    # 「倍」の方が先に現れても、優先順が上の「1:x」の表記を採用する
+    assert_spec_values(['0.5倍 (1:4)'], 'ratio', [0.25])
+
+
+def test_parse_spec_values_full_width():
+    assert_spec_values(['約１，０５０ｇ', '０．２５ｍ'], 'g', [1050.0, numpy.nan])
+    assert_spec_values(['０．２５ｍ'], 'mm', [250.0])
+
+
+def test_parse_spec_values_decimal_comma():
+    assert_spec_values(['0,7m', '1,050g'], 'mm', [700.0, numpy.nan])
+    assert_spec_values(['1,050g', '0,5kg'], 'g', [1050.0, 500.0])